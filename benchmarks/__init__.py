@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Load-test harness: stub LLM/SMTP servers, data seeder and scenario runner
@@ -0,0 +1,183 @@
+"""
+Run load scenarios against the API backed by stub LLM/SMTP servers.
+
+Seeds a fresh SQLite database, starts the stubs and the API as subprocesses,
+drives each scenario at a fixed concurrency and reports throughput and
+p50/p95/p99 latency. Results are also written as JSON for regression tracking.
+
+    python -m benchmarks.run --rows 100000 --requests 500 --concurrency 20 --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _generate(i, rows):
+    return "POST", "/generate", {
+        "prompt": f"Benchmark prompt {i}: follow up on the proposal",
+        "recipient": f"user{i}@example.com",
+        "tone": "friendly",
+    }
+
+
+SCENARIOS = {
+    "generate": _generate,
+    "send": lambda i, rows: ("POST", f"/send/{random.randint(1, rows)}", None),
+    "emails": lambda i, rows: ("GET", "/emails?limit=50", None),
+    "emails_filtered": lambda i, rows: ("GET", "/emails?status=sent&tone=formal&limit=50", None),
+    "stats": lambda i, rows: ("GET", "/stats", None),
+    "search": lambda i, rows: ("GET", "/emails/search?q=proposal+meeting&limit=20", None),
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, requests: int, concurrency: int, rows: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i):
+        nonlocal errors
+        method, url, body = SCENARIOS[name](i, rows)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    duration = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(requests / duration, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2),
+            "mean": round(sum(latencies) / len(latencies), 2),
+        },
+    }
+
+
+async def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+async def main(args):
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="instamailer-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{workdir / 'bench.db'}",
+        EMAIL_API_CONFIGURED="true",
+        LLM_PROVIDER="stub",
+        EMAIL_API_KEY="bench",
+        EMAIL_API_URL=f"http://127.0.0.1:{args.llm_port}/generate",
+        EMAIL_API_STREAM_URL=f"http://127.0.0.1:{args.llm_port}/stream",
+        GENERATION_CACHE_ENABLED="false",
+        GENERATION_CACHE_PATH=str(workdir / "generation_cache.db"),
+        SMTP_HOST="127.0.0.1",
+        SMTP_PORT=str(args.smtp_port),
+        SMTP_USERNAME="bench",
+        SMTP_PASSWORD="bench",
+        EMAIL_FROM="bench@example.com",
+        SMTP_USE_TLS="false",
+    )
+
+    print(f"Seeding {args.rows} drafts into {workdir}...")
+    subprocess.run([sys.executable, "-m", "benchmarks.seed", "--rows", str(args.rows)],
+                   cwd=ROOT, env=env, check=True)
+
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.stub_llm", "--port", str(args.llm_port),
+                          "--latency-ms", str(args.llm_latency_ms)], cwd=ROOT, env=env),
+        subprocess.Popen([sys.executable, "-m", "benchmarks.stub_smtp", "--port", str(args.smtp_port)],
+                         cwd=ROOT, env=env),
+        subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.api_port),
+                          "--log-level", "warning"], cwd=ROOT, env=env),
+    ]
+    base_url = f"http://127.0.0.1:{args.api_port}"
+    results = {}
+    try:
+        await wait_ready(f"{base_url}/health")
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            for name in args.scenarios:
+                results[name] = await run_scenario(client, name, args.requests, args.concurrency, args.rows)
+                latency = results[name]["latency_ms"]
+                print(f"{name:<16} {results[name]['throughput_rps']:>9} req/s  "
+                      f"p50 {latency['p50']:>8} ms  p95 {latency['p95']:>8} ms  "
+                      f"p99 {latency['p99']:>8} ms  errors {results[name]['errors']}")
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rows": args.rows,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "llm_latency_ms": args.llm_latency_ms,
+        },
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Wrote {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000, help="drafts to seed (e.g. 1000, 100000, 1000000)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--llm-latency-ms", type=int, default=200)
+    parser.add_argument("--api-port", type=int, default=8700)
+    parser.add_argument("--llm-port", type=int, default=8701)
+    parser.add_argument("--smtp-port", type=int, default=8725)
+    parser.add_argument("--workdir", default=None, help="directory for the benchmark database")
+    parser.add_argument("--output", default=None, help="write JSON results to this file")
+    asyncio.run(main(parser.parse_args()))
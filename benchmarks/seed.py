@@ -0,0 +1,87 @@
+"""
+Seed a benchmark database with synthetic drafts.
+
+Inserts Draft/DraftBody rows in bulk batches, then rebuilds the stats rollup
+and search index so every endpoint sees a consistent dataset.
+
+    python -m benchmarks.seed --rows 100000 --database-url sqlite:///bench.db
+"""
+
+import argparse
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+TONES = ["friendly", "formal", "casual", "persuasive"]
+TYPES = ["general", "meeting"]
+STATUSES = ["draft"] * 5 + ["sent"] * 4 + ["failed"]
+TOPICS = [
+    "a follow-up on last week's meeting", "the quarterly product update", "rescheduling our call",
+    "an introduction to our new service", "feedback on the proposal", "the upcoming team offsite",
+]
+
+
+def seed(rows: int, batch_size: int = 5000, build_search: bool = True):
+    # Imported here so DATABASE_URL from the command line is picked up by config
+    from sqlalchemy import func, insert, select
+    from sqlmodel import Session
+    from database import engine
+    from models import Draft, DraftBody
+    import migrations
+    import search_index
+    import stats_rollup
+
+    random.seed(rows)
+    migrations.upgrade_database(engine)
+    with engine.begin() as connection:
+        first_id = (connection.execute(select(func.max(Draft.id))).scalar() or 0) + 1
+
+    now = datetime.now(timezone.utc)
+    for start in range(first_id, first_id + rows, batch_size):
+        drafts, bodies = [], []
+        for draft_id in range(start, min(start + batch_size, first_id + rows)):
+            topic = random.choice(TOPICS)
+            tone = random.choice(TONES)
+            status = random.choice(STATUSES)
+            created_at = now - timedelta(minutes=random.randint(0, 60 * 24 * 200))
+            drafts.append({
+                "id": draft_id,
+                "recipient": f"user{draft_id % 5000}@example.com",
+                "tone": tone,
+                "status": status,
+                "type": random.choice(TYPES),
+                "created_at": created_at,
+                "sent_at": created_at + timedelta(minutes=5) if status == "sent" else None,
+                "subject": f"About {topic}",
+            })
+            bodies.append({
+                "draft_id": draft_id,
+                "prompt": f"Write about {topic}",
+                "content": (
+                    f"Hi there,\n\nI wanted to reach out about {topic}. "
+                    "Please let me know if you have any questions. I look forward to hearing from you.\n\n"
+                    "Best,\n[Your Name]"
+                ),
+            })
+        with engine.begin() as connection:
+            connection.execute(insert(Draft), drafts)
+            connection.execute(insert(DraftBody), bodies)
+
+    with Session(engine) as session:
+        stats_rollup.rebuild(session)
+        if build_search:
+            search_index.rebuild(session)
+        session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--skip-search", action="store_true", help="skip the full-text index rebuild")
+    args = parser.parse_args()
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    seed(args.rows, args.batch_size, build_search=not args.skip_search)
+    print(f"Seeded {args.rows} drafts")
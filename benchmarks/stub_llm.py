@@ -0,0 +1,60 @@
+"""
+Stub LLM provider for benchmarks.
+
+Answers the request shape EmailGenerator sends with a canned completion after
+a fixed delay, so runs measure the API rather than a real provider.
+
+    python -m benchmarks.stub_llm --port 8701 --latency-ms 200
+"""
+
+import argparse
+import asyncio
+import json
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+LATENCY = 0.2
+BODY = (
+    "Quick follow-up on our meeting\n\nHi there,\n\nThanks for taking the time to meet this week. "
+    "I have put together the notes and next steps we discussed and would love your feedback "
+    "before Friday.\n\nBest,\n[Your Name]"
+)
+
+
+async def generate(request: Request):
+    body = await request.json()
+    await asyncio.sleep(LATENCY)
+    usage = {"prompt_tokens": len(body.get("prompt", "").split()), "completion_tokens": len(BODY.split())}
+    return JSONResponse({"candidates": [{"content": {"text": BODY}}], "usage": usage})
+
+
+async def stream(request: Request):
+    await request.json()
+    words = BODY.split(" ")
+
+    async def events():
+        for i, word in enumerate(words):
+            await asyncio.sleep(LATENCY / len(words))
+            chunk = word if i == 0 else " " + word
+            yield f"data: {json.dumps({'candidates': [{'content': {'text': chunk}}]})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+app = Starlette(routes=[
+    Route("/generate", generate, methods=["POST"]),
+    Route("/stream", stream, methods=["POST"]),
+])
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8701)
+    parser.add_argument("--latency-ms", type=int, default=200)
+    args = parser.parse_args()
+    LATENCY = args.latency_ms / 1000
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,64 @@
+"""
+Stub SMTP relay for benchmarks.
+
+Speaks just enough ESMTP for mailer's pooled sessions (EHLO, AUTH PLAIN,
+MAIL/RCPT/DATA, NOOP, RSET, QUIT) and discards every message. No TLS, so run
+the API with SMTP_USE_TLS=false.
+
+    python -m benchmarks.stub_smtp --port 8725
+"""
+
+import argparse
+import asyncio
+
+received = 0
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    global received
+
+    async def reply(line: str):
+        writer.write(line.encode() + b"\r\n")
+        await writer.drain()
+
+    await reply("220 stub ESMTP ready")
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode(errors="replace").strip().split(" ", 1)[0].upper()
+            if command == "EHLO":
+                await reply("250-stub\r\n250-AUTH PLAIN\r\n250 8BITMIME")
+            elif command == "HELO":
+                await reply("250 stub")
+            elif command == "AUTH":
+                await reply("235 Authentication successful")
+            elif command in ("MAIL", "RCPT", "RSET", "NOOP"):
+                await reply("250 OK")
+            elif command == "DATA":
+                await reply("354 End data with <CR><LF>.<CR><LF>")
+                while (await reader.readline()) not in (b".\r\n", b""):
+                    pass
+                received += 1
+                await reply("250 OK queued")
+            elif command == "QUIT":
+                await reply("221 Bye")
+                break
+            else:
+                await reply("502 Command not implemented")
+    finally:
+        writer.close()
+
+
+async def serve(port: int):
+    server = await asyncio.start_server(handle, "127.0.0.1", port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8725)
+    args = parser.parse_args()
+    asyncio.run(serve(args.port))
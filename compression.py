@@ -0,0 +1,97 @@
+"""
+Transparent zlib compression for large text columns.
+
+Values are stored as ``MAGIC + zlib stream``, compressed against a preset
+dictionary of phrases common in generated emails so that even short bodies
+shrink. Rows written before compression was enabled (plain text) are still
+read back unchanged.
+"""
+
+import threading
+import zlib
+from sqlalchemy.dialects.mysql import LONGBLOB
+from sqlalchemy.types import LargeBinary, TypeDecorator
+from config import get_settings
+
+MAGIC = b"\x00Z1"
+
+# Changing this invalidates every stored value; add a new MAGIC version instead.
+PRESET_DICTIONARY = (
+    "Dear Sir/Madam, Hi there, Hello, I hope this email finds you well. "
+    "I am writing to let you know about the meeting. Thank you for your time and consideration. "
+    "Please let me know if you have any questions. I look forward to hearing from you. "
+    "Looking forward to your reply. Please find attached the details. Could we schedule a call "
+    "next week? Let me know what time works best for you. I wanted to follow up on our conversation. "
+    "Thanks again, Best regards,\n[Your Name] Best,\n[Your Name] Kind regards, Sincerely, Cheers, "
+    "Write a friendly email about: Write a formal email about: Write a casual email about: "
+    "Write a persuasive email about: "
+).encode("utf-8")
+
+
+class CompressionStats:
+    """Running totals of bytes written through CompressedText columns."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    def record(self, raw: int, stored: int):
+        with self._lock:
+            self.values += 1
+            self.raw_bytes += raw
+            self.stored_bytes += stored
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "values_compressed": self.values,
+                "raw_bytes": self.raw_bytes,
+                "stored_bytes": self.stored_bytes,
+                "compression_ratio": round(self.raw_bytes / self.stored_bytes, 2) if self.stored_bytes else None
+            }
+
+
+stats = CompressionStats()
+
+
+def compress(text: str) -> bytes:
+    raw = text.encode("utf-8")
+    compressor = zlib.compressobj(get_settings().body_compression_level, zdict=PRESET_DICTIONARY)
+    stored = MAGIC + compressor.compress(raw) + compressor.flush()
+    stats.record(len(raw), len(stored))
+    return stored
+
+
+def decompress(value) -> str:
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not value.startswith(MAGIC):
+        return value.decode("utf-8")
+    decompressor = zlib.decompressobj(zdict=PRESET_DICTIONARY)
+    return (decompressor.decompress(value[len(MAGIC):]) + decompressor.flush()).decode("utf-8")
+
+
+class CompressedText(TypeDecorator):
+    """Text column stored zlib-compressed; decompressed when loaded."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        # MySQL's plain BLOB caps values at 64 KiB
+        if dialect.name == "mysql":
+            return dialect.type_descriptor(LONGBLOB())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress(value)
@@ -1,6 +1,110 @@
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlmodel import SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from config import get_settings
+import metrics
+import tracing
 
 settings = get_settings()
 
-engine = create_engine(f"sqlite:///{settings.sqlite_path}")
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout)}")
+    cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    span = tracing.start_span(f"sql {operation}", **{"db.statement": statement[:500]})
+    conn.info.setdefault("query_started", []).append((time.perf_counter(), operation, span))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started, operation, span = conn.info["query_started"].pop()
+    metrics.db_query_duration.observe(time.perf_counter() - started, operation=operation)
+    if span is not None:
+        span.finish()
+
+
+def _on_error(exception_context):
+    # Failed statements never reach after_cursor_execute; close out their timing here
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        _, _, span = connection.info["query_started"].pop()
+        if span is not None:
+            span.record_error(exception_context.original_exception)
+            span.finish()
+
+
+def _instrument(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _on_error)
+
+
+# Async drivers substituted for each backend's sync driver
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def _is_memory_sqlite(url) -> bool:
+    database = url.database or ""
+    return database in ("", ":memory:") or url.query.get("mode") == "memory"
+
+
+def _engine_options(url, echo: bool):
+    options = {"echo": echo}
+    # In-memory SQLite gets a StaticPool/SingletonThreadPool, which take no sizing
+    if url.get_backend_name() != "sqlite" or not _is_memory_sqlite(url):
+        options["pool_size"] = settings.db_pool_size
+        options["max_overflow"] = settings.db_max_overflow
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False, "timeout": settings.sqlite_busy_timeout / 1000}
+    else:
+        options["pool_pre_ping"] = settings.db_pool_pre_ping
+        options["pool_recycle"] = settings.db_pool_recycle
+    return options
+
+
+def create_db_engine(url: str = None, echo: bool = False):
+    """Build the sync engine from ``url`` (default: Settings.database_url_resolved).
+
+    SQLite gets WAL journaling and the configured pragmas on every connection;
+    server databases get pre-ping and connection recycling.
+    """
+    url = make_url(url or settings.database_url_resolved)
+    engine = create_engine(url, **_engine_options(url, echo))
+    if url.get_backend_name() == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    _instrument(engine)
+    return engine
+
+
+def create_async_db_engine(url: str = None, echo: bool = False):
+    """Async counterpart of ``create_db_engine`` using the backend's asyncio driver."""
+    url = make_url(url or settings.database_url_resolved)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+    engine = create_async_engine(url, **_engine_options(url, echo))
+    if backend == "sqlite":
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    _instrument(engine.sync_engine)
+    return engine
+
+
+# Sync engine for worker threads and CLI scripts; routes use the async session factory
+engine = create_db_engine()
+async_engine = create_async_db_engine()
+async_session = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
@@ -1,44 +1,180 @@
-import requests
+import asyncio
 import logging
-from typing import Dict, Optional
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from config import get_settings
+from generation_cache import cache
+from llm_router import get_generation_provider
+import templating
+import metrics
+import tracing
 
 logger = logging.getLogger(__name__)
 
+
+class StreamInterrupted(Exception):
+    """The provider stream failed after some content was already yielded."""
+
+
+class RateLimiter:
+    """Spaces async callers so at most ``rate`` calls start per second (0 disables)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+rate_limiter = RateLimiter(get_settings().email_api_rate_limit)
+
+
 class EmailGenerator:
-    def __init__(self):
+    def __init__(self, provider=None):
         self.settings = get_settings()
+        self.provider = provider or get_generation_provider()
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.settings.email_api_configured and self.provider.ready)
+
+    @staticmethod
+    def _prompt(prompt: str, tone: str) -> str:
+        return f"Write a {tone} email about: {prompt}"
+
+    def _cache_model(self) -> str:
+        return f"{self.provider.name}/{self.provider.model}"
+
+    async def _acached(self, prompt: str, tone: str) -> Optional[str]:
+        if not self.settings.generation_cache_enabled:
+            return None
+        return await cache.aget(prompt, tone, self._cache_model())
 
-    def generate_email_content(self, prompt: str, tone: str = "friendly") -> Optional[str]:
-        if not self.settings.email_api_ready:
+    async def _astore(self, prompt: str, tone: str, content: Optional[str]) -> Optional[str]:
+        if content and self.settings.generation_cache_enabled:
+            await cache.aset(prompt, tone, self._cache_model(), content)
+        return content
+
+    async def agenerate_email_content(self, prompt: str, tone: str = "friendly") -> Optional[str]:
+        if not self.ready:
             logger.warning("Email API not configured, using fallback")
             return None
+        cached = await self._acached(prompt, tone)
+        if cached:
+            return cached
+        await rate_limiter.acquire()
+        started, outcome = time.perf_counter(), "error"
         try:
-            payload = {
-                "prompt": f"Write a {tone} email about: {prompt}",
-                "temperature": 0.7
-            }
-            headers = {
-                "Authorization": f"Bearer {self.settings.email_api_key}"
-            }
-            response = requests.post(self.settings.email_api_url, json=payload, headers=headers, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            if "candidates" in data and data["candidates"]:
-                return data["candidates"][0]["content"]["text"].strip()
-            logger.warning(f"No content returned from Gemini API: {data}")
-            return None
+            with tracing.span("llm.generate", mode="async", provider=self.provider.name, model=self.provider.model):
+                completion = await self.provider.acomplete(self._prompt(prompt, tone))
+            outcome = "success" if completion.content else "empty"
+            return await self._astore(prompt, tone, completion.content)
         except Exception as e:
-            logger.error(f"Gemini API error: {e}")
+            logger.error(f"{self.provider.name} API error: {e}")
             return None
+        finally:
+            metrics.llm_request_duration.observe(
+                time.perf_counter() - started, provider=self.provider.name, mode="async", outcome=outcome
+            )
+
+    async def astream_email_content(self, prompt: str, tone: str = "friendly") -> AsyncIterator[str]:
+        """Yield content chunks as the provider streams them.
+
+        Yields nothing when the API is unavailable or fails before the first chunk,
+        leaving the caller to fall back; a failure after that raises StreamInterrupted
+        so partial output is never mistaken for a finished email. Providers without a
+        stream endpoint yield the full completion as one chunk.
+        """
+        if not self.provider.stream_url:
+            content = await self.agenerate_email_content(prompt, tone)
+            if content:
+                yield content
+            return
+        if not self.ready:
+            logger.warning("Email API not configured, using fallback")
+            return
+        cached = await self._acached(prompt, tone)
+        if cached:
+            yield cached
+            return
+        chunks = []
+        await rate_limiter.acquire()
+        started = time.perf_counter()
+        try:
+            async for chunk in self.provider.astream(self._prompt(prompt, tone)):
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            logger.error(f"{self.provider.name} API streaming error: {e}")
+            metrics.llm_request_duration.observe(
+                time.perf_counter() - started, provider=self.provider.name, mode="stream", outcome="error"
+            )
+            if chunks:
+                raise StreamInterrupted(str(e)) from e
+            return
+        metrics.llm_request_duration.observe(
+            time.perf_counter() - started, provider=self.provider.name, mode="stream",
+            outcome="success" if chunks else "empty"
+        )
+        await self._astore(prompt, tone, "".join(chunks).strip())
 
-    def generate_email_with_subject(self, prompt: str, tone: str = "friendly") -> Dict[str, str]:
-        content = self.generate_email_content(prompt, tone)
+    @staticmethod
+    def with_subject(content: Optional[str], prompt: str, tone: str) -> Dict[str, str]:
         if not content:
             # fallback email
+            metrics.generation_fallback_total.inc()
+            active = tracing.current_span()
+            if active is not None:
+                active.set_attribute("fallback", True)
             greeting = "Hi there," if tone.lower() in ["friendly","casual"] else "Dear Sir/Madam,"
             closing = "Best,\n[Your Name]" if tone.lower() in ["friendly","casual"] else "Best regards,\n[Your Name]"
             content = f"{greeting}\n\n{prompt}\n\n{closing}"
         first_line = content.strip().split("\n")[0]
         subject = first_line if len(first_line) < 80 else " ".join(prompt.split()[:7])
         return {"content": content, "subject": subject}
+
+    async def agenerate_email_with_subject(self, prompt: str, tone: str = "friendly") -> Dict[str, str]:
+        return self.with_subject(await self.agenerate_email_content(prompt, tone), prompt, tone)
+
+    async def agenerate_batch(self, items: List[Tuple[str, str]]) -> List[Dict[str, str]]:
+        """Generate ``(prompt, tone)`` items concurrently, preserving order."""
+        semaphore = asyncio.Semaphore(self.settings.generate_batch_concurrency)
+
+        async def generate_one(prompt: str, tone: str) -> Dict[str, str]:
+            async with semaphore:
+                return await self.agenerate_email_with_subject(prompt, tone)
+
+        return await asyncio.gather(*(generate_one(prompt, tone) for prompt, tone in items))
+
+    async def agenerate_template(self, prompt: str, variables: List[str], tone: str = "friendly") -> Dict[str, str]:
+        """Generate one email whose recipient-specific details are Jinja2 placeholders.
+
+        The returned content and subject are template sources for ``templating.render``.
+        """
+        placeholders = ", ".join(f"{{{{ {name} }}}}" for name in variables)
+        template_prompt = (
+            f"{prompt}\n\nWrite it as a reusable template: keep these placeholders exactly "
+            f"as written wherever the recipient's details belong: {placeholders}"
+        )
+        content = await self.agenerate_email_content(template_prompt, tone)
+        if content and not templating.is_valid(content):
+            logger.warning("Generated template has invalid placeholder syntax, using fallback")
+            content = None
+        if content and not templating.placeholders(content) <= set(variables):
+            unknown = sorted(templating.placeholders(content) - set(variables))
+            logger.warning(f"Generated template uses unknown placeholders {unknown}, using fallback")
+            content = None
+        email_data = self.with_subject(content, prompt, tone)
+        subject = email_data["subject"]
+        if not templating.is_valid(subject) or not templating.placeholders(subject) <= set(variables):
+            email_data["subject"] = " ".join(prompt.split()[:7])
+        return email_data
@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+def cache_key(prompt: str, tone: str, model: str) -> str:
+    normalized = " ".join(prompt.split()).casefold()
+    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return f"{model}:{tone.lower()}:{digest}"
+
+
+class GenerationCache:
+    """Two-tier cache of generated email bodies: in-process LRU over a SQLite file.
+
+    Entries expire after ``ttl`` seconds. The LRU evicts on every insert; the
+    SQLite tier is trimmed back to ``max_entries`` every ``TRIM_INTERVAL``
+    writes. Async callers use ``aget``/``aset``, which answer memory hits
+    inline and run SQLite work in a worker thread.
+    """
+
+    TRIM_INTERVAL = 500  # disk writes between eviction passes
+
+    def __init__(self, path, ttl: int, memory_entries: int, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = None
+        self._writes_since_trim = 0
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS generation_cache ("
+                "key TEXT PRIMARY KEY, content TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_generation_cache_accessed_at "
+                "ON generation_cache (accessed_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: str, content: str, created_at: float):
+        with self._lock:
+            self._memory[key] = (content, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _get_memory(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[1] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                return entry[0]
+            self._memory.pop(key, None)
+            return None
+
+    def _get_disk(self, key: str, now: float) -> Optional[str]:
+        with self._db_lock:
+            try:
+                db = self._db()
+                row = db.execute(
+                    "SELECT content, created_at FROM generation_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and now - row[1] <= self.ttl:
+                    db.execute("UPDATE generation_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                    db.commit()
+                    self._remember(key, row[0], row[1])
+                    with self._lock:
+                        self.hits_disk += 1
+                    return row[0]
+                if row:
+                    db.execute("DELETE FROM generation_cache WHERE key = ?", (key,))
+                    db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Generation cache read error: {e}")
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _set_disk(self, key: str, content: str, now: float):
+        with self._db_lock:
+            try:
+                db = self._db()
+                db.execute(
+                    "INSERT OR REPLACE INTO generation_cache (key, content, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, content, now, now),
+                )
+                self._writes_since_trim += 1
+                if self._writes_since_trim >= self.TRIM_INTERVAL:
+                    self._trim(db, now)
+                db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Generation cache write error: {e}")
+
+    def _trim(self, db: sqlite3.Connection, now: float):
+        """Drop expired rows, then the least recently used rows beyond ``max_entries``."""
+        self._writes_since_trim = 0
+        db.execute("DELETE FROM generation_cache WHERE created_at < ?", (now - self.ttl,))
+        excess = db.execute("SELECT COUNT(*) FROM generation_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            db.execute(
+                "DELETE FROM generation_cache WHERE key IN "
+                "(SELECT key FROM generation_cache ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+
+    def get(self, prompt: str, tone: str, model: str) -> Optional[str]:
+        key, now = cache_key(prompt, tone, model), time.time()
+        content = self._get_memory(key, now)
+        return content if content is not None else self._get_disk(key, now)
+
+    def set(self, prompt: str, tone: str, model: str, content: str):
+        key, now = cache_key(prompt, tone, model), time.time()
+        self._remember(key, content, now)
+        self._set_disk(key, content, now)
+
+    async def aget(self, prompt: str, tone: str, model: str) -> Optional[str]:
+        key, now = cache_key(prompt, tone, model), time.time()
+        content = self._get_memory(key, now)
+        if content is not None:
+            return content
+        return await asyncio.to_thread(self._get_disk, key, now)
+
+    async def aset(self, prompt: str, tone: str, model: str, content: str):
+        key, now = cache_key(prompt, tone, model), time.time()
+        self._remember(key, content, now)
+        await asyncio.to_thread(self._set_disk, key, content, now)
+
+    def stats(self):
+        with self._db_lock:
+            try:
+                disk_entries = self._db().execute("SELECT COUNT(*) FROM generation_cache").fetchone()[0]
+            except sqlite3.Error:
+                disk_entries = None
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": round((self.hits_memory + self.hits_disk) / lookups * 100, 1) if lookups else 0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries
+            }
+
+    def close(self):
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+cache = GenerationCache(
+    settings.generation_cache_path,
+    ttl=settings.generation_cache_ttl,
+    memory_entries=settings.generation_cache_memory_entries,
+    max_entries=settings.generation_cache_max_entries,
+)
@@ -1,58 +1,261 @@
 """
-LLM Client for interacting with OpenRouter API.
+Provider-agnostic LLM clients.
+
+Each provider only knows its request and response shapes; every call goes
+through the shared pooled HTTP client below, so all providers honour the
+same timeouts and connection limits, and report token usage the same way.
+``get_provider()`` returns the provider selected by ``llm_provider``.
 """
 
-import requests
+import httpx
+import json
 import logging
-from config import OPENROUTER_API_KEY, OPENROUTER_MODEL
+from dataclasses import dataclass
+from httpx_sse import aconnect_sse
+from typing import AsyncIterator, Dict, Optional, Tuple
+from config import get_settings
+import metrics
+import tracing
 
 logger = logging.getLogger(__name__)
 
-class OpenRouterLLMClient:
-    """
-    Handles communication with the OpenRouter LLM API.
-    """
+_http_client: Optional[httpx.AsyncClient] = None
 
-    API_URL = "https://openrouter.ai/api/v1/chat/completions"
 
-    def __init__(self, api_key: str = OPENROUTER_API_KEY, model: str = OPENROUTER_MODEL):
-        self.api_key = api_key
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(get_settings().email_api_timeout, connect=5.0)
+
+
+def _limits() -> httpx.Limits:
+    settings = get_settings()
+    return httpx.Limits(
+        max_connections=settings.email_api_max_connections,
+        max_keepalive_connections=settings.email_api_max_connections,
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared keep-alive client so generations reuse pooled TCP/TLS connections."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(http2=get_settings().email_api_http2, timeout=_timeout(), limits=_limits())
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+@dataclass
+class Completion:
+    content: Optional[str]
+    provider: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class LLMProvider:
+    """Base provider; subclasses describe one vendor's wire format."""
+
+    name = ""
+
+    def __init__(self, model: str, api_key: str = "", url: str = "", stream_url: str = "",
+                 temperature: float = 0.7):
         self.model = model
+        self.api_key = api_key
+        self.url = url
+        self.stream_url = stream_url
+        self.temperature = temperature
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.api_key and self.url)
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{self.model}"
+
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    def payload(self, prompt: str, stream: bool = False) -> Dict:
+        raise NotImplementedError
+
+    def parse_content(self, data: Dict) -> Optional[str]:
+        raise NotImplementedError
+
+    def parse_chunk(self, data: Dict) -> Optional[str]:
+        return self.parse_content(data)
+
+    def parse_usage(self, data: Dict) -> Tuple[int, int]:
+        """(prompt_tokens, completion_tokens) reported in a response, or zeros"""
+        return 0, 0
+
+    def _completion(self, data: Dict) -> Completion:
+        content = self.parse_content(data)
+        if not content:
+            logger.warning(f"No content returned from {self.name}: {data}")
+        prompt_tokens, completion_tokens = self.parse_usage(data)
+        self._record_usage(prompt_tokens, completion_tokens)
+        return Completion(content.strip() if content else None, self.name, self.model,
+                          prompt_tokens, completion_tokens)
 
-    def generate_email(self, prompt: str) -> str:
-        """
-        Generate email content using the LLM.
+    def _record_usage(self, prompt_tokens: int, completion_tokens: int):
+        if prompt_tokens:
+            metrics.llm_tokens_total.inc(prompt_tokens, provider=self.name, kind="prompt")
+        if completion_tokens:
+            metrics.llm_tokens_total.inc(completion_tokens, provider=self.name, kind="completion")
+        active = tracing.current_span()
+        if active is not None and (prompt_tokens or completion_tokens):
+            active.set_attribute("llm.prompt_tokens", prompt_tokens)
+            active.set_attribute("llm.completion_tokens", completion_tokens)
 
-        Args:
-            prompt: Text prompt to send to the model.
+    async def acomplete(self, prompt: str) -> Completion:
+        response = await get_http_client().post(self.url, json=self.payload(prompt),
+                                                headers=tracing.inject(self.headers()))
+        response.raise_for_status()
+        return self._completion(response.json())
 
-        Returns:
-            Generated content as a string.
-        """
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield content chunks from the provider's SSE endpoint."""
+        async with aconnect_sse(get_http_client(), "POST", self.stream_url,
+                                json=self.payload(prompt, stream=True),
+                                headers=tracing.inject(self.headers())) as event_source:
+            event_source.response.raise_for_status()
+            async for event in event_source.aiter_sse():
+                if event.data == "[DONE]":
+                    break
+                data = json.loads(event.data)
+                self._record_usage(*self.parse_usage(data))
+                chunk = self.parse_chunk(data)
+                if chunk:
+                    yield chunk
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+    BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+
+    @classmethod
+    def from_settings(cls, settings, model: Optional[str] = None):
+        # The endpoint overrides only apply to the configured model
+        default_model = model in (None, settings.email_model)
+        model = model or settings.email_model
+        return cls(
+            model,
+            api_key=settings.email_api_key,
+            url=(default_model and settings.email_api_url) or f"{cls.BASE_URL}/{model}:generateContent",
+            stream_url=(default_model and settings.email_api_stream_url)
+            or f"{cls.BASE_URL}/{model}:streamGenerateContent?alt=sse",
+            temperature=settings.llm_temperature,
+        )
+
+    def headers(self) -> Dict[str, str]:
+        return {"x-goog-api-key": self.api_key}
+
+    def payload(self, prompt: str, stream: bool = False) -> Dict:
+        return {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {"temperature": self.temperature},
         }
 
+    def parse_content(self, data: Dict) -> Optional[str]:
+        candidates = data.get("candidates")
+        if not candidates:
+            return None
+        parts = candidates[0].get("content", {}).get("parts", [])
+        return "".join(part.get("text", "") for part in parts) or None
+
+    def parse_usage(self, data: Dict) -> Tuple[int, int]:
+        usage = data.get("usageMetadata") or {}
+        return usage.get("promptTokenCount", 0), usage.get("candidatesTokenCount", 0)
+
+
+class OpenRouterProvider(LLMProvider):
+    name = "openrouter"
+
+    @classmethod
+    def from_settings(cls, settings, model: Optional[str] = None):
+        return cls(
+            model or settings.openrouter_model,
+            api_key=settings.openrouter_api_key,
+            url=settings.openrouter_url,
+            stream_url=settings.openrouter_url,
+            temperature=settings.llm_temperature,
+        )
+
+    def payload(self, prompt: str, stream: bool = False) -> Dict:
         body = {
             "model": self.model,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ]
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
         }
+        if stream:
+            body["stream"] = True
+        return body
+
+    def parse_content(self, data: Dict) -> Optional[str]:
+        choices = data.get("choices")
+        return choices[0]["message"]["content"] if choices else None
+
+    def parse_chunk(self, data: Dict) -> Optional[str]:
+        choices = data.get("choices")
+        return choices[0].get("delta", {}).get("content") if choices else None
+
+    def parse_usage(self, data: Dict) -> Tuple[int, int]:
+        usage = data.get("usage") or {}
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+
+class StubProvider(LLMProvider):
+    """The minimal ``{"prompt"} -> {"candidates": [{"content": {"text"}}]}`` shape.
+
+    Served by ``benchmarks.stub_llm``; also fits simple self-hosted endpoints.
+    """
+
+    name = "stub"
+
+    @classmethod
+    def from_settings(cls, settings, model: Optional[str] = None):
+        return cls(
+            model or settings.email_model,
+            api_key=settings.email_api_key,
+            url=settings.email_api_url,
+            stream_url=settings.email_api_stream_url,
+            temperature=settings.llm_temperature,
+        )
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.url)
+
+    def payload(self, prompt: str, stream: bool = False) -> Dict:
+        return {"prompt": prompt, "temperature": self.temperature}
+
+    def parse_content(self, data: Dict) -> Optional[str]:
+        candidates = data.get("candidates")
+        return candidates[0]["content"]["text"] if candidates else None
+
+    def parse_usage(self, data: Dict) -> Tuple[int, int]:
+        usage = data.get("usage") or {}
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+
+PROVIDERS = {cls.name: cls for cls in (GeminiProvider, OpenRouterProvider, StubProvider)}
+
 
-        try:
-            response = requests.post(
-                self.API_URL,
-                headers=headers,
-                json=body,
-                timeout=30
-            )
-
-            response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"OpenRouter API request failed: {e}")
-            raise
+def get_provider(name: Optional[str] = None, model: Optional[str] = None) -> LLMProvider:
+    """Build the named provider (default ``llm_provider``) from settings, optionally for another model."""
+    settings = get_settings()
+    name = (name or settings.llm_provider).lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider {name!r}; expected one of {sorted(PROVIDERS)}")
+    return PROVIDERS[name].from_settings(settings, model)
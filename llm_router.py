@@ -0,0 +1,196 @@
+"""
+Latency-aware routing with hedged requests across LLM providers.
+
+Each provider keeps a rolling window of recent call latencies and an
+exponentially weighted error rate. A generation goes to a primary picked at
+random weighted by ``(1 - error_rate) / mean_latency``; if it has not
+answered by its p95-derived deadline (or fails before then), the request is
+hedged to the best remaining provider and whichever answers first wins. The
+loser is cancelled.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, List, Optional
+from config import get_settings
+from llm_client import Completion, LLMProvider, get_provider
+import metrics
+import tracing
+
+ERROR_DECAY = 0.1  # weight of the newest outcome in the error rate
+
+
+class ProviderStats:
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.error_rate = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            if ok:
+                self.latencies.append(latency)
+            self.error_rate += ERROR_DECAY * ((0.0 if ok else 1.0) - self.error_rate)
+
+    def record_latency(self, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+
+    def quantile(self, q: float, min_samples: int) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def weight(self, default_latency: float) -> float:
+        with self._lock:
+            mean = sum(self.latencies) / len(self.latencies) if self.latencies else default_latency
+            return max(1.0 - self.error_rate, 0.01) / max(mean, 0.001)
+
+    def snapshot(self):
+        with self._lock:
+            count = len(self.latencies)
+            mean = sum(self.latencies) / count if count else None
+        return {
+            "samples": count,
+            "mean_latency": round(mean, 4) if mean is not None else None,
+            "error_rate": round(self.error_rate, 4),
+        }
+
+
+class LLMRouter:
+    """Provider-compatible front for several providers; ``acomplete`` hedges, other calls go to the best one."""
+
+    name = "router"
+
+    def __init__(self, providers: List[LLMProvider]):
+        settings = get_settings()
+        self.providers = providers
+        self.stats = {p.label: ProviderStats(settings.llm_latency_window) for p in providers}
+        self.quantile = settings.llm_hedge_quantile
+        self.min_delay = settings.llm_hedge_min_delay
+        self.default_delay = settings.llm_hedge_default_delay
+        self.min_samples = settings.llm_latency_min_samples
+
+    @property
+    def model(self) -> str:
+        return "+".join(p.label for p in self.providers)
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{self.model}"
+
+    @property
+    def ready(self) -> bool:
+        return any(p.ready for p in self.providers)
+
+    @property
+    def stream_url(self) -> str:
+        return next((p.stream_url for p in self.providers if p.ready and p.stream_url), "")
+
+    def _ranked(self) -> List[LLMProvider]:
+        """Ready providers, the primary drawn by weight and the rest best-first"""
+        ready = [p for p in self.providers if p.ready]
+        if len(ready) < 2:
+            return ready
+        weights = [self.stats[p.label].weight(self.default_delay) for p in ready]
+        primary = random.choices(ready, weights=weights)[0]
+        rest = sorted((p for p in ready if p is not primary),
+                      key=lambda p: self.stats[p.label].weight(self.default_delay), reverse=True)
+        return [primary] + rest
+
+    def hedge_delay(self, provider: LLMProvider) -> float:
+        estimate = self.stats[provider.label].quantile(self.quantile, self.min_samples)
+        return max(self.min_delay, estimate if estimate is not None else self.default_delay)
+
+    async def _attempt(self, provider: LLMProvider, prompt: str, hedge: bool) -> Completion:
+        started, ok = time.perf_counter(), False
+        try:
+            with tracing.span("llm.attempt", provider=provider.name, model=provider.model, hedge=hedge):
+                completion = await provider.acomplete(prompt)
+            ok = bool(completion.content)
+            return completion
+        except asyncio.CancelledError:
+            # A hedge loser is no error, but it was at least this slow
+            self.stats[provider.label].record_latency(time.perf_counter() - started)
+            started = None
+            raise
+        finally:
+            if started is not None:
+                elapsed = time.perf_counter() - started
+                self.stats[provider.label].record(elapsed, ok)
+                metrics.llm_request_duration.observe(
+                    elapsed, provider=provider.name, mode="attempt", outcome="success" if ok else "error"
+                )
+
+    async def acomplete(self, prompt: str) -> Completion:
+        ranked = self._ranked()
+        if not ranked:
+            raise RuntimeError("No LLM provider is configured")
+        primary = asyncio.create_task(self._attempt(ranked[0], prompt, hedge=False))
+        tasks = [primary]
+        try:
+            if len(ranked) == 1:
+                return await primary
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay(ranked[0]))
+            if done and self._succeeded(primary):
+                metrics.llm_hedge_total.inc(outcome="primary")
+                return primary.result()
+
+            # Primary is slow (hedge) or already failed (failover): race the backup
+            failed = primary if done else None
+            backup = asyncio.create_task(self._attempt(ranked[1], prompt, hedge=True))
+            tasks.append(backup)
+            pending = {backup} if done else {primary, backup}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if self._succeeded(task):
+                        if failed is not None:
+                            outcome = "failover"
+                        else:
+                            outcome = "hedge" if task is backup else "primary"
+                        metrics.llm_hedge_total.inc(outcome=outcome)
+                        return task.result()
+                    failed = task
+            # Neither answered; surface the last error or empty completion
+            return failed.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    def _succeeded(task: asyncio.Task) -> bool:
+        return not task.cancelled() and task.exception() is None and bool(task.result().content)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        streaming = [p for p in self._ranked() if p.stream_url]
+        if not streaming:
+            raise RuntimeError("No streaming LLM provider is configured")
+        async for chunk in streaming[0].astream(prompt):
+            yield chunk
+
+    def snapshot(self):
+        return {
+            p.label: dict(self.stats[p.label].snapshot(), hedge_delay=round(self.hedge_delay(p), 4))
+            for p in self.providers
+        }
+
+
+def _parse_entry(entry: str) -> LLMProvider:
+    name, _, model = entry.strip().partition(":")
+    return get_provider(name, model or None)
+
+
+def get_generation_provider():
+    """The configured provider, or a hedging router when backups are configured."""
+    settings = get_settings()
+    backups = [entry for entry in settings.llm_backup_providers.split(",") if entry.strip()]
+    if not backups:
+        return get_provider()
+    return LLMRouter([get_provider()] + [_parse_entry(entry) for entry in backups])
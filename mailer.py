@@ -1,31 +1,153 @@
+import contextvars
+import logging
 import smtplib
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from config import get_settings
+import metrics
+import tracing
+
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+
+class SMTPConnectionPool:
+    """Bounded pool of authenticated SMTP sessions.
+
+    Idle sessions are checked with NOOP before reuse and dropped once they
+    have been idle longer than ``idle_timeout`` seconds.
+    """
+
+    def __init__(self, size: int, idle_timeout: int):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = deque()
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        with tracing.span("smtp.connect", host=settings.smtp_host), \
+                metrics.smtp_phase_duration.time(phase="connect"):
+            if settings.smtp_use_ssl or settings.smtp_port == 465:
+                smtp = smtplib.SMTP_SSL(settings.smtp_host, settings.smtp_port, timeout=settings.smtp_timeout)
+            else:
+                smtp = smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=settings.smtp_timeout)
+        try:
+            if settings.smtp_use_tls and not isinstance(smtp, smtplib.SMTP_SSL):
+                with tracing.span("smtp.starttls"), metrics.smtp_phase_duration.time(phase="starttls"):
+                    smtp.ehlo()
+                    smtp.starttls()
+                    smtp.ehlo()
+            with tracing.span("smtp.login"), metrics.smtp_phase_duration.time(phase="login"):
+                smtp.login(settings.smtp_username, settings.smtp_password)
+        except Exception:
+            self._close(smtp)
+            raise
+        return smtp
+
+    @staticmethod
+    def _close(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _is_alive(smtp) -> bool:
+        try:
+            return smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                smtp, last_used = self._idle.pop()
+            if time.monotonic() - last_used > self.idle_timeout or not self._is_alive(smtp):
+                self._close(smtp)
+                continue
+            return smtp
+        return self._connect()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a live SMTP session; it is discarded if the block raises."""
+        self._slots.acquire()
+        try:
+            smtp = self._checkout()
+            try:
+                yield smtp
+            except Exception:
+                self._close(smtp)
+                raise
+            with self._lock:
+                self._idle.append((smtp, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for smtp, _ in idle:
+            self._close(smtp)
+
+
+pool = SMTPConnectionPool(settings.smtp_pool_size, settings.smtp_pool_idle_timeout)
+
+
+def build_message(to_email: str, subject: str, content: str) -> MIMEText:
+    msg = MIMEText(content)
+    msg["Subject"] = subject
+    msg["From"] = settings.email_from
+    msg["To"] = to_email
+    return msg
+
+
 def send_email(to_email: str, subject: str, content: str):
     if not settings.smtp_configured:
-        print("SMTP not configured.")
-        return False
-    try:
-        msg = MIMEText(content)
-        msg["Subject"] = subject
-        msg["From"] = settings.email_from
-        msg["To"] = to_email
-
-        if settings.smtp_port == 465:
-            with smtplib.SMTP_SSL(settings.smtp_host, settings.smtp_port, timeout=settings.smtp_timeout) as smtp:
-                smtp.login(settings.smtp_username, settings.smtp_password)
-                smtp.send_message(msg)
-        else:
-            with smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=settings.smtp_timeout) as smtp:
-                smtp.ehlo()
-                smtp.starttls()
-                smtp.ehlo()
-                smtp.login(settings.smtp_username, settings.smtp_password)
-                smtp.send_message(msg)
-        return True
-    except Exception as e:
-        print("Error sending email:", e)
+        logger.warning("SMTP not configured")
         return False
+    msg = build_message(to_email, subject, content)
+    # One retry on a fresh session covers connections the relay dropped
+    # between the NOOP check and the send.
+    for attempt in range(2):
+        try:
+            with pool.connection() as smtp:
+                with tracing.span("smtp.send", attempt=attempt + 1), \
+                        metrics.smtp_phase_duration.time(phase="send"):
+                    smtp.send_message(msg)
+            metrics.smtp_send_total.inc(result="success")
+            return True
+        except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+            if attempt == 0:
+                continue
+            logger.error(f"Error sending email: {e}")
+        except Exception as e:
+            logger.error(f"Error sending email: {e}")
+            break
+    metrics.smtp_send_total.inc(result="failure")
+    return False
+
+
+def send_emails(messages):
+    """Send ``(to_email, subject, content)`` tuples concurrently over pooled sessions.
+
+    Returns one success flag per message, in order.
+    """
+    if not settings.smtp_configured:
+        logger.warning("SMTP not configured")
+        return [False] * len(messages)
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        # Each task runs in a copy of the caller's context so SMTP spans keep their parent
+        futures = [executor.submit(contextvars.copy_context().run, send_email, *m) for m in messages]
+        return [future.result() for future in futures]
@@ -1,16 +1,37 @@
-from fastapi import FastAPI, HTTPException, Form, Body
+from fastapi import FastAPI, HTTPException, Form, Body, Query, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlmodel import SQLModel, Session, create_engine, select
-from typing import List, Optional
-from datetime import datetime, timedelta, timezone
-from collections import Counter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sse_starlette.sse import EventSourceResponse
+from sqlmodel import select
+from sqlalchemy import func, case, and_, or_
+from sqlalchemy.orm import selectinload
+from typing import Dict, List, Optional
+from datetime import date, datetime, timedelta, timezone
+import base64
+import csv
+import io
+import json
 import logging
-import os
+import secrets
+import time
 
-from models import Draft
-from email_generator import EmailGenerator
-from mailer import send_email
+from models import Draft, DraftBody, DraftStatsDaily, SendJob, draft_subject
+import stats_rollup
+import search_index
+import outbox
+import migrations
+from email_generator import EmailGenerator, StreamInterrupted
+from llm_client import close_http_client
+from mailer import send_emails, pool as smtp_pool
 from config import get_settings
+from generation_cache import cache as generation_cache
+from jinja2 import TemplateError
+import templating
+import compression
+import metrics
+import tracing
+import profiler
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,18 +39,27 @@ logger = logging.getLogger(__name__)
 # ----------------------------
 # Database Setup
 # ----------------------------
-backend_dir = os.path.dirname(os.path.abspath(__file__))
-database_path = os.path.join(backend_dir, "database.db")
-engine = create_engine(f"sqlite:///{database_path}", echo=False)
+from database import engine, async_engine, async_session
 
 
-def ensure_aware(dt):
-    """Ensure datetime is timezone-aware in UTC"""
-    if dt is None:
-        return dt
-    if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt
+async def save_draft(draft: Draft) -> Draft:
+    async with async_session() as session:
+        session.add(draft)
+        await session.flush()
+        await session.run_sync(stats_rollup.record_insert, draft)
+        await session.run_sync(search_index.index_drafts, [draft])
+        await session.commit()
+    return draft
+
+
+async def save_drafts(drafts: List[Draft]) -> List[Draft]:
+    async with async_session() as session:
+        session.add_all(drafts)
+        await session.flush()
+        await session.run_sync(stats_rollup.record_inserts, drafts)
+        await session.run_sync(search_index.index_drafts, drafts)
+        await session.commit()
+    return drafts
 
 # ----------------------------
 # FastAPI App with Lifespan
@@ -41,8 +71,23 @@ async def lifespan(app: FastAPI):
     settings = get_settings()
     masked_key = settings.email_api_key[:10] + "..." if settings.email_api_key else "MISSING"
     logger.info(f"Email API loaded: {masked_key}")
-    SQLModel.metadata.create_all(engine)
+    applied = await run_in_threadpool(migrations.upgrade_database, engine)
+    if applied:
+        logger.info(f"Applied database migrations: {applied}")
+    async with async_session() as session:
+        if await session.run_sync(stats_rollup.rebuild_if_empty):
+            await session.commit()
+            logger.info("Backfilled draft stats rollup")
+    outbox_workers.start()
     yield
+    outbox_workers.stop()
+    smtp_pool.close_all()
+    await close_http_client()
+    generation_cache.close()
+    await async_engine.dispose()
+    engine.dispose()
+
+outbox_workers = outbox.OutboxWorkerPool(engine)
 
 app = FastAPI(lifespan=lifespan)
 email_generator = EmailGenerator()
@@ -63,8 +108,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Trace-Id"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Per-route latency histogram; streaming routes are timed to their first byte"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.http_request_duration.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=str(status)
+        )
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """Root span per request; honours an incoming traceparent header"""
+    with tracing.span(f"{request.method} {request.url.path}", parent=tracing.extract(request.headers),
+                      method=request.method) as span:
+        response = await call_next(request)
+        if span is not None:
+            route = request.scope.get("route")
+            if route:
+                span.name = f"{request.method} {route.path}"
+            span.set_attribute("status", response.status_code)
+            response.headers["X-Trace-Id"] = span.trace_id
+        return response
+
 # ----------------------------
 # Pydantic Models
 # ----------------------------
@@ -76,6 +154,16 @@ class GenerateRequest(BaseModel):
     tone: str = "friendly"
     type: str = "general"
 
+class CampaignRecipient(BaseModel):
+    recipient: str
+    variables: Dict[str, str] = {}
+
+class CampaignRequest(BaseModel):
+    prompt: str
+    recipients: List[CampaignRecipient]
+    tone: str = "friendly"
+    type: str = "general"
+
 class EmailDraftResponse(BaseModel):
     id: int
     prompt: str
@@ -88,108 +176,424 @@ class EmailDraftResponse(BaseModel):
     sent_at: Optional[datetime] = None
     subject: Optional[str] = None
 
+class EmailDraftSummary(BaseModel):
+    """Listing row; only the columns requested via ``fields`` are present."""
+    id: int
+    prompt: Optional[str] = None
+    content: Optional[str] = None
+    recipient: Optional[str] = None
+    tone: Optional[str] = None
+    status: Optional[str] = None
+    type: Optional[str] = None
+    created_at: datetime
+    sent_at: Optional[datetime] = None
+    subject: Optional[str] = None
+
+class BatchSendRequest(BaseModel):
+    draft_ids: Optional[List[int]] = None
+    status: Optional[str] = None
+
+# ----------------------------
+# Draft Helpers
+# ----------------------------
+def new_draft(request: GenerateRequest, email_data: dict) -> Draft:
+    return Draft(
+        recipient=request.recipient,
+        tone=request.tone,
+        type=request.type,
+        subject=email_data.get("subject"),
+        body=DraftBody(prompt=request.prompt, content=email_data["content"])
+    )
+
+
+def draft_response(draft: Draft) -> EmailDraftResponse:
+    """Merge a draft's metadata with its (already loaded) body"""
+    return EmailDraftResponse(**draft.model_dump(), prompt=draft.body.prompt, content=draft.body.content)
+
+# ----------------------------
+# Listing Helpers
+# ----------------------------
+DRAFT_FIELDS = list(EmailDraftResponse.model_fields)
+BODY_FIELDS = ("prompt", "content")
+DRAFT_COLUMNS = {
+    name: getattr(DraftBody if name in BODY_FIELDS else Draft, name) for name in DRAFT_FIELDS
+}
+
+
+def draft_filters(
+    status: Optional[str] = None,
+    type: Optional[str] = None,
+    tone: Optional[str] = None,
+    recipient: Optional[str] = None,
+):
+    """Shared query-string filters for draft listings"""
+    conditions = []
+    if status is not None:
+        conditions.append(Draft.status == status)
+    if type is not None:
+        conditions.append(Draft.type == type)
+    if tone is not None:
+        conditions.append(Draft.tone == tone)
+    if recipient is not None:
+        conditions.append(Draft.recipient == recipient)
+    return conditions
+
+
+def draft_columns(fields: Optional[str] = None):
+    """Resolve a ``fields=`` projection; id and created_at are always included"""
+    if not fields:
+        return DRAFT_FIELDS
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in DRAFT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return [f for f in DRAFT_FIELDS if f in ("id", "created_at") or f in requested]
+
+
+def draft_select(columns):
+    """Select the named listing columns, joining draft_body only when a body column is requested"""
+    query = select(*[DRAFT_COLUMNS[c] for c in columns])
+    if any(c in BODY_FIELDS for c in columns):
+        query = query.select_from(Draft).outerjoin(DraftBody)
+    return query
+
+
+def encode_cursor(created_at: datetime, draft_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{draft_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, draft_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(draft_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 # ----------------------------
 # Routes
 # ----------------------------
 @app.get("/")
-def root():
+async def root():
     return {"message": "InstaMailer Backend is running."}
 
 @app.post("/generate", response_model=EmailDraftResponse)
-def generate(request: GenerateRequest):
+async def generate(request: GenerateRequest):
     """Generate email draft and save to DB"""
     try:
-        email_data = email_generator.generate_email_with_subject(request.prompt, request.tone)
-        draft = Draft(
-            prompt=request.prompt,
-            content=email_data["content"],
-            recipient=request.recipient,
-            tone=request.tone,
-            type=request.type,
-            subject=email_data.get("subject")
-        )
-        with Session(engine) as session:
-            session.add(draft)
-            session.commit()
-            session.refresh(draft)
-        return draft
+        email_data = await email_generator.agenerate_email_with_subject(request.prompt, request.tone)
+        return draft_response(await save_draft(new_draft(request, email_data)))
     except Exception as e:
         logger.error(f"Error generating email: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error generating email")
 
-@app.post("/send/{draft_id}")
-def send(draft_id: int):
-    """Send email using SMTP"""
+@app.post("/generate/batch", response_model=List[EmailDraftResponse])
+async def generate_batch(requests: List[GenerateRequest]):
+    """Generate drafts for many recipients concurrently and save them in one transaction"""
+    if len(requests) > get_settings().generate_batch_max_items:
+        raise HTTPException(status_code=400, detail="Too many items in batch")
     try:
-        with Session(engine) as session:
-            draft = session.get(Draft, draft_id)
-            if not draft:
-                raise HTTPException(status_code=404, detail="Draft not found")
+        results = await email_generator.agenerate_batch([(r.prompt, r.tone) for r in requests])
+        drafts = [new_draft(request, email_data) for request, email_data in zip(requests, results)]
+        return [draft_response(d) for d in await save_drafts(drafts)]
+    except Exception as e:
+        logger.error(f"Error generating batch: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error generating batch")
 
-            subject = draft.subject or draft.content.split("\n")[0][:50] if draft.content else "Email"
+@app.post("/generate/campaign", response_model=List[EmailDraftResponse])
+async def generate_campaign(request: CampaignRequest):
+    """Generate one template and render a personalized draft per recipient"""
+    if len(request.recipients) > get_settings().generate_campaign_max_recipients:
+        raise HTTPException(status_code=400, detail="Too many recipients in campaign")
+    variables = sorted({name for r in request.recipients for name in r.variables})
+    try:
+        template = await email_generator.agenerate_template(request.prompt, variables, request.tone)
 
-            success = send_email(
-                to_email=draft.recipient,
-                subject=subject,
-                content=draft.content
-            )
+        def render():
+            return [
+                Draft(
+                    recipient=r.recipient,
+                    tone=request.tone,
+                    type=request.type,
+                    subject=templating.render(template["subject"], r.variables),
+                    body=DraftBody(
+                        prompt=request.prompt,
+                        content=templating.render(template["content"], r.variables)
+                    )
+                )
+                for r in request.recipients
+            ]
 
-            if success:
-                draft.status = "sent"
-                draft.sent_at = datetime.now(timezone.utc)
-                session.commit()
-                return {"status": "sent", "message": "Email sent successfully"}
-            else:
-                draft.status = "failed"
-                session.commit()
-                raise HTTPException(status_code=500, detail="Failed to send email")
+        return [draft_response(d) for d in await save_drafts(await run_in_threadpool(render))]
+    except TemplateError as e:
+        logger.error(f"Error rendering campaign template: {e}")
+        raise HTTPException(status_code=400, detail=f"Invalid campaign template: {e}")
+    except Exception as e:
+        logger.error(f"Error generating campaign: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error generating campaign")
+
+@app.post("/generate/stream")
+async def generate_stream(request: GenerateRequest):
+    """Stream generated content over SSE, then save the finished draft.
+
+    Emits ``token`` events with content chunks and a final ``draft`` event
+    carrying the saved draft, or ``error`` if the stream breaks off or saving
+    fails; an interrupted stream is not saved.
+    """
+    async def events():
+        chunks = []
+        try:
+            async for chunk in email_generator.astream_email_content(request.prompt, request.tone):
+                chunks.append(chunk)
+                yield {"event": "token", "data": chunk}
+        except StreamInterrupted:
+            yield {"event": "error", "data": "Generation was interrupted"}
+            return
+        content = "".join(chunks).strip() or None
+        email_data = email_generator.with_subject(content, request.prompt, request.tone)
+        if content is None:
+            yield {"event": "token", "data": email_data["content"]}
+        try:
+            draft = await save_draft(new_draft(request, email_data))
+        except Exception as e:
+            logger.error(f"Error saving streamed email: {e}", exc_info=True)
+            yield {"event": "error", "data": "Error generating email"}
+            return
+        yield {
+            "event": "draft",
+            "data": draft_response(draft).model_dump_json()
+        }
+
+    return EventSourceResponse(events())
+
+@app.post("/send/batch")
+async def send_batch(request: BatchSendRequest):
+    """Send many drafts over pooled SMTP sessions, committing once per chunk.
+
+    Drafts already queued in the outbox are left to it and reported as ``queued``.
+    """
+    if request.draft_ids is None and request.status is None:
+        raise HTTPException(status_code=400, detail="Provide draft_ids or status")
+    try:
+        chunk_size = get_settings().send_batch_chunk_size
+        results = []
+        async with async_session() as session:
+            query = select(Draft, outbox.has_active_job().label("queued")).options(selectinload(Draft.body))
+            if request.draft_ids is not None:
+                query = query.where(Draft.id.in_(request.draft_ids))
+            if request.status is not None:
+                query = query.where(Draft.status == request.status)
+            drafts = []
+            for draft, queued in (await session.exec(query.order_by(Draft.id))).all():
+                if queued:
+                    results.append({"id": draft.id, "status": "queued"})
+                else:
+                    drafts.append(draft)
+
+            for start in range(0, len(drafts), chunk_size):
+                chunk = drafts[start:start + chunk_size]
+                sent = await run_in_threadpool(
+                    send_emails, [(d.recipient, draft_subject(d), d.body.content if d.body else "") for d in chunk]
+                )
+                now = datetime.now(timezone.utc)
+                for draft, success in zip(chunk, sent):
+                    old_status = draft.status
+                    draft.status = "sent" if success else "failed"
+                    await session.run_sync(stats_rollup.record_status_change, draft, old_status)
+                    if success:
+                        draft.sent_at = now
+                    results.append({"id": draft.id, "status": draft.status})
+                await session.commit()
+
+        if request.draft_ids is not None:
+            found = {r["id"] for r in results}
+            results.extend({"id": i, "status": "not_found"} for i in request.draft_ids if i not in found)
+        return {
+            "sent": sum(1 for r in results if r["status"] == "sent"),
+            "failed": sum(1 for r in results if r["status"] == "failed"),
+            "results": results
+        }
+    except Exception as e:
+        logger.error(f"Error sending batch: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error sending batch")
+
+@app.post("/send/{draft_id}", status_code=202)
+async def send(draft_id: int):
+    """Queue a draft for SMTP delivery by the outbox workers"""
+    try:
+        async with async_session() as session:
+            if not await session.get(Draft, draft_id):
+                raise HTTPException(status_code=404, detail="Draft not found")
+            job = await session.run_sync(outbox.enqueue, draft_id)
+            await session.commit()
+            return {"status": job.status, "job_id": job.id, "message": "Email queued for sending"}
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Unexpected error sending email: {e}", exc_info=True)
+        logger.error(f"Unexpected error queueing email: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.get("/emails", response_model=List[EmailDraftResponse])
-def get_emails():
-    """Fetch all email drafts"""
+@app.get("/send/jobs/{job_id}")
+async def get_send_job(job_id: int):
+    """Get the delivery state of a queued send"""
+    async with async_session() as session:
+        job = await session.get(SendJob, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+@app.get("/emails", response_model=List[EmailDraftSummary], response_model_exclude_unset=True)
+async def get_emails(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    filters: list = Depends(draft_filters),
+):
+    """Fetch a page of email drafts, newest first.
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` for the next page.
+    """
+    columns = draft_columns(fields)
+    conditions = list(filters)
+    if cursor:
+        created_at, draft_id = decode_cursor(cursor)
+        conditions.append(or_(
+            Draft.created_at < created_at,
+            and_(Draft.created_at == created_at, Draft.id < draft_id)
+        ))
     try:
-        with Session(engine) as session:
-            drafts = session.exec(select(Draft).order_by(Draft.created_at.desc())).all()
-            return drafts
+        async with async_session() as session:
+            query = (
+                draft_select(columns)
+                .where(*conditions)
+                .order_by(Draft.created_at.desc(), Draft.id.desc())
+                .limit(limit + 1)
+            )
+            rows = [dict(zip(columns, row)) for row in (await session.exec(query)).all()]
+        if len(rows) > limit:
+            rows = rows[:limit]
+            response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        return rows
     except Exception as e:
         logger.error(f"Error fetching emails: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error fetching emails")
 
+@app.get("/emails/export")
+async def export_emails(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fields: Optional[str] = None,
+    filters: list = Depends(draft_filters),
+):
+    """Stream matching drafts as NDJSON or CSV without materializing the result set"""
+    columns = draft_columns(fields)
+    query = (
+        draft_select(columns)
+        .where(*filters)
+        .order_by(Draft.created_at.desc(), Draft.id.desc())
+    )
+
+    async def rows():
+        async with async_session() as session:
+            result = await session.stream(query)
+            async for partition in result.partitions(1000):
+                yield partition
+
+    async def ndjson():
+        async for partition in rows():
+            yield "".join(
+                json.dumps(dict(zip(columns, row)), default=lambda v: v.isoformat()) + "\n"
+                for row in partition
+            )
+
+    async def csv_lines():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        async for partition in rows():
+            writer.writerows(partition)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    if format == "csv":
+        return StreamingResponse(
+            csv_lines(),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=emails.csv"}
+        )
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.get("/emails/search")
+async def search_emails(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """Full-text search over draft subject, prompt and content, best match first"""
+    if not q.split():
+        raise HTTPException(status_code=400, detail="Empty search query")
+    try:
+        async with async_session() as session:
+            return await session.run_sync(search_index.search, q, limit, offset)
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error searching emails: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error searching emails")
+
 @app.get("/stats")
-def get_stats():
+async def get_stats():
     """Get email sending statistics"""
     try:
-        with Session(engine) as session:
-            drafts = session.exec(select(Draft)).all()
+        async with async_session() as session:
+            # Served from the DraftStatsDaily rollup, so cost scales with days, not drafts
+            total = func.sum(DraftStatsDaily.count)
+            status_counts = dict((await session.exec(
+                select(DraftStatsDaily.status, total).group_by(DraftStatsDaily.status)
+            )).all())
 
-            total_sent = sum(1 for d in drafts if d.status == "sent")
-            total_drafts = sum(1 for d in drafts if d.status == "draft")
-            total_failed = sum(1 for d in drafts if d.status == "failed")
-            total_emails = len(drafts)
+            total_sent = status_counts.get("sent", 0)
+            total_drafts = status_counts.get("draft", 0)
+            total_failed = status_counts.get("failed", 0)
+            total_emails = sum(status_counts.values())
             success_rate = (total_sent / total_emails * 100) if total_emails else 0
 
-            week_ago = datetime.now(timezone.utc) - timedelta(days=7)
-            recent_activity = sum(1 for d in drafts if ensure_aware(d.created_at) >= week_ago)
-
-            tone_counter = Counter(d.tone for d in drafts)
-            popular_tones = dict(tone_counter.most_common())
-
-            monthly_stats = []
-            for i in range(6):
-                month_start = datetime.now(timezone.utc).replace(day=1) - timedelta(days=30*i)
-                month_end = month_start.replace(day=1) + timedelta(days=32)
-                month_end = month_end.replace(day=1) - timedelta(days=1)
-                month_drafts = [d for d in drafts if month_start <= ensure_aware(d.created_at) <= month_end]
-                monthly_stats.append({
-                    "month": month_start.strftime("%b"),
-                    "sent": sum(1 for d in month_drafts if d.status == "sent"),
-                    "drafts": sum(1 for d in month_drafts if d.status == "draft")
-                })
+            today = datetime.now(timezone.utc).date()
+            week_ago = today - timedelta(days=6)
+            recent_activity = (await session.exec(
+                select(func.coalesce(total, 0)).where(DraftStatsDaily.day >= week_ago)
+            )).one()
+
+            popular_tones = dict((await session.exec(
+                select(DraftStatsDaily.tone, total)
+                .group_by(DraftStatsDaily.tone)
+                .having(total > 0)
+                .order_by(total.desc())
+            )).all())
+
+            month_starts = []
+            year, month = today.year, today.month
+            for _ in range(6):
+                month_starts.append(date(year, month, 1))
+                year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+            month_bucket = case(
+                *[(DraftStatsDaily.day >= start, i) for i, start in enumerate(month_starts)]
+            ).label("month")
+            monthly_counts = (await session.exec(
+                select(month_bucket, DraftStatsDaily.status, total)
+                .where(DraftStatsDaily.day >= month_starts[-1])
+                .group_by(month_bucket, DraftStatsDaily.status)
+            )).all()
+
+            monthly_stats = [
+                {"month": start.strftime("%b"), "sent": 0, "drafts": 0} for start in month_starts
+            ]
+            for bucket, status, count in monthly_counts:
+                if status == "sent":
+                    monthly_stats[bucket]["sent"] = count
+                elif status == "draft":
+                    monthly_stats[bucket]["drafts"] = count
             monthly_stats.reverse()
 
             return {
@@ -205,38 +609,106 @@ def get_stats():
         logger.error(f"Error calculating stats: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error calculating stats")
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Get generation cache hit/miss counters"""
+    return await run_in_threadpool(generation_cache.stats)
+
+@app.get("/llm/stats")
+async def get_llm_stats():
+    """Rolling latency/error estimates and hedge deadlines per routed LLM provider"""
+    provider = email_generator.provider
+    return provider.snapshot() if hasattr(provider, "snapshot") else {}
+
+@app.get("/storage/stats")
+async def get_storage_stats():
+    """Get compression ratio for draft bodies written by this process"""
+    return compression.stats.snapshot()
+
 @app.delete("/emails/{draft_id}")
-def delete_email(draft_id: int):
+async def delete_email(draft_id: int):
     """Delete a draft"""
     try:
-        with Session(engine) as session:
-            draft = session.get(Draft, draft_id)
+        async with async_session() as session:
+            draft = await session.get(Draft, draft_id, options=[selectinload(Draft.body)])
             if not draft:
                 raise HTTPException(status_code=404, detail="Draft not found")
-            session.delete(draft)
-            session.commit()
+            if not await session.run_sync(outbox.remove_jobs, draft_id):
+                raise HTTPException(status_code=409, detail="Draft is being sent")
+            await session.run_sync(stats_rollup.record_delete, draft)
+            await session.run_sync(search_index.remove_draft, draft)
+            await session.delete(draft)
+            await session.commit()
             return {"message": "Email deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error deleting email: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error deleting email")
 
 @app.post("/update_draft/{draft_id}")
-def update_draft(draft_id: int, content: str = Body(...)):
+async def update_draft(draft_id: int, content: str = Body(...)):
     """Update draft content"""
     try:
-        with Session(engine) as session:
-            draft = session.get(Draft, draft_id)
-            if not draft:
+        async with async_session() as session:
+            draft = await session.get(Draft, draft_id, options=[selectinload(Draft.body)])
+            if not draft or not draft.body:
                 raise HTTPException(status_code=404, detail="Draft not found")
-            draft.content = content
-            session.commit()
+            # The index entry must be removed while it still matches the old text
+            await session.run_sync(search_index.remove_draft, draft)
+            draft.body.content = content
+            await session.run_sync(search_index.index_drafts, [draft])
+            await session.commit()
             return {"message": "Draft updated"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error updating draft: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error updating draft")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of request, LLM, SMTP and DB metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def require_admin(request: Request, enabled: bool):
+    """404 unless the endpoint is enabled and an admin token is set; 403 on a wrong X-Admin-Token"""
+    admin_token = get_settings().admin_token
+    if not enabled or not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = request.headers.get("X-Admin-Token", "")
+    if not secrets.compare_digest(token.encode(), admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@app.get("/traces")
+async def get_traces(
+    request: Request,
+    trace_id: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=2000)
+):
+    """Most recent finished spans, newest first, optionally for a single trace"""
+    require_admin(request, get_settings().traces_endpoint_enabled)
+    return tracing.recent_spans(trace_id, limit)
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def profile_process(
+    request: Request,
+    seconds: float = Query(5.0, gt=0),
+    interval_ms: float = Query(10.0, ge=1, le=1000),
+    include_idle: bool = False
+):
+    """Sample all thread stacks for ``seconds`` and return flamegraph collapsed stacks"""
+    settings = get_settings()
+    require_admin(request, settings.profiler_enabled)
+    seconds = min(seconds, settings.profiler_max_seconds)
+    try:
+        stacks = await run_in_threadpool(profiler.sample, seconds, interval_ms / 1000, include_idle)
+    except profiler.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(profiler.collapsed(stacks))
+
 @app.get("/health")
-def health_check():
+async def health_check():
     return {"status": "healthy"}
 
 # ----------------------------
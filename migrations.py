@@ -0,0 +1,220 @@
+"""
+Versioned schema migrations.
+
+Each migration is a function of a sync Connection, applied once in version
+order and recorded in the schema_migrations table. upgrade_database()
+serializes concurrent upgrades from replicas sharing one database. Migration 1 creates a
+frozen copy of the original schema, so every database reaches the current
+models by the same steps.
+
+Usage:
+    python migrations.py          # apply pending migrations
+    python migrations.py status   # list applied and pending versions
+"""
+
+import logging
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Integer, MetaData, Table, Text, inspect, select, text
+from sqlmodel import AutoString
+from models import SchemaMigration
+import search_index
+
+logger = logging.getLogger(__name__)
+
+
+# The schema as it stood before migration 2. Never edit it: changes belong in
+# a new migration.
+INITIAL_SCHEMA = MetaData()
+Table(
+    "draft", INITIAL_SCHEMA,
+    Column("id", Integer, primary_key=True),
+    Column("prompt", Text, nullable=False),
+    Column("content", Text, nullable=False),
+    Column("recipient", AutoString, nullable=False),
+    Column("tone", AutoString, nullable=False, index=True),
+    Column("status", AutoString, nullable=False, index=True),
+    Column("type", AutoString, nullable=False),
+    Column("created_at", DateTime, nullable=False, index=True),
+    Column("sent_at", DateTime),
+    Column("subject", AutoString),
+)
+Table(
+    "draftstatsdaily", INITIAL_SCHEMA,
+    Column("day", Date, primary_key=True),
+    Column("status", AutoString, primary_key=True),
+    Column("tone", AutoString, primary_key=True),
+    Column("type", AutoString, primary_key=True),
+    Column("count", Integer, nullable=False),
+)
+Table(
+    "sendjob", INITIAL_SCHEMA,
+    Column("id", Integer, primary_key=True),
+    Column("draft_id", Integer, ForeignKey("draft.id"), nullable=False, index=True),
+    Column("status", AutoString, nullable=False, index=True),
+    Column("attempts", Integer, nullable=False),
+    Column("next_attempt_at", DateTime, nullable=False, index=True),
+    Column("locked_at", DateTime),
+    Column("last_error", AutoString),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+
+def _initial_schema(connection):
+    INITIAL_SCHEMA.create_all(connection)
+
+
+QUERY_INDEXES = {
+    "ix_draft_status_created_at": "status, created_at",
+    "ix_draft_type_created_at": "type, created_at",
+    "ix_draft_recipient": "recipient",
+}
+
+# draft_body as migration 3 created it; the stub draft table only resolves the foreign key
+BODY_SCHEMA = MetaData()
+Table("draft", BODY_SCHEMA, Column("id", Integer, primary_key=True))
+DRAFT_BODY = Table(
+    "draft_body", BODY_SCHEMA,
+    Column("draft_id", Integer, ForeignKey("draft.id"), primary_key=True),
+    Column("prompt", Text, nullable=False),
+    Column("content", Text, nullable=False),
+)
+
+
+def _draft_query_indexes(connection):
+    existing = {i["name"] for i in inspect(connection).get_indexes("draft")}
+    for name, columns in QUERY_INDEXES.items():
+        if name not in existing:
+            connection.execute(text(f"CREATE INDEX {name} ON draft ({columns})"))
+    # Superseded by the (status, created_at) composite index
+    if "ix_draft_status" in existing:
+        connection.execute(text("DROP INDEX ix_draft_status" if connection.dialect.name == "sqlite"
+                                else "DROP INDEX ix_draft_status ON draft"))
+
+
+def _split_draft_bodies(connection):
+    DRAFT_BODY.create(connection, checkfirst=True)
+    if "content" not in {c["name"] for c in inspect(connection).get_columns("draft")}:
+        return
+    connection.execute(text(
+        "INSERT INTO draft_body (draft_id, prompt, content) SELECT id, prompt, content FROM draft"
+    ))
+    connection.execute(text("ALTER TABLE draft DROP COLUMN prompt"))
+    connection.execute(text("ALTER TABLE draft DROP COLUMN content"))
+
+
+def _compress_draft_bodies(connection):
+    # SQLite stores the compressed bytes in the existing columns as-is; server
+    # databases need binary columns. Existing plain-text rows stay readable.
+    if connection.dialect.name == "mysql":
+        connection.execute(text(
+            "ALTER TABLE draft_body MODIFY prompt LONGBLOB NOT NULL, MODIFY content LONGBLOB NOT NULL"
+        ))
+
+
+def _draft_search_index(connection):
+    search_index.create_index(connection)
+    search_index.rebuild(connection)
+
+
+def _contentless_search_index(connection):
+    # Migration 5 built a content-storing FTS5 table; drop the duplicate text
+    if connection.dialect.name == "sqlite":
+        search_index.drop_index(connection)
+        search_index.create_index(connection)
+        search_index.rebuild(connection)
+
+
+# Append-only. A migration must produce the same schema in every release, so
+# it describes its own tables or changes rather than reading the current
+# models (which move on); edit models.py and add a new entry instead.
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "draft composite query indexes", _draft_query_indexes),
+    (3, "move draft prompt/content into draft_body", _split_draft_bodies),
+    (4, "store draft bodies compressed", _compress_draft_bodies),
+    (5, "full-text search index over drafts", _draft_search_index),
+    (6, "contentless sqlite search index", _contentless_search_index),
+]
+
+
+MIGRATION_LOCK = "instamailer_schema_migrations"
+MIGRATION_LOCK_TIMEOUT = 600  # seconds
+
+
+def applied_versions(connection):
+    # Early builds recorded versions under the default table name
+    tables = inspect(connection).get_table_names()
+    if "schemamigration" in tables and "schema_migrations" not in tables:
+        connection.execute(text("ALTER TABLE schemamigration RENAME TO schema_migrations"))
+    SchemaMigration.__table__.create(connection, checkfirst=True)
+    return set(connection.execute(select(SchemaMigration.version)).scalars())
+
+
+def upgrade(connection):
+    """Apply pending migrations on ``connection``; returns the versions applied."""
+    applied_versions(connection)
+    if connection.dialect.name == "sqlite":
+        # A no-op write takes SQLite's write lock now, before reading the applied
+        # versions; a concurrent upgrade waits here until this one commits
+        connection.execute(SchemaMigration.__table__.delete().where(SchemaMigration.version.is_(None)))
+    done = applied_versions(connection)
+    applied = []
+    for version, description, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        logger.info(f"Applying migration {version}: {description}")
+        migrate(connection)
+        connection.execute(
+            SchemaMigration.__table__.insert().values(
+                version=version, description=description, applied_at=datetime.now(timezone.utc)
+            )
+        )
+        applied.append(version)
+    return applied
+
+
+@contextmanager
+def _migration_lock(engine):
+    """Hold a MySQL named lock on its own connection until the block, and its commit, finish."""
+    if engine.dialect.name != "mysql":
+        yield
+        return
+    with engine.connect() as lock_connection:
+        acquired = lock_connection.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"),
+            {"name": MIGRATION_LOCK, "timeout": MIGRATION_LOCK_TIMEOUT},
+        ).scalar()
+        if acquired != 1:
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+        try:
+            yield
+        finally:
+            lock_connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK})
+
+
+def upgrade_database(engine):
+    """Apply pending migrations in their own transaction, one process at a time.
+
+    MySQL DDL commits implicitly, so without the lock two replicas starting
+    together could both run the same migration.
+    """
+    with _migration_lock(engine):
+        with engine.begin() as connection:
+            return upgrade(connection)
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) > 1 and sys.argv[1] == "status":
+        with engine.begin() as connection:
+            done = applied_versions(connection)
+        for version, description, _ in MIGRATIONS:
+            print(f"{'applied' if version in done else 'pending'}  {version:>3}  {description}")
+        sys.exit(0)
+    applied = upgrade_database(engine)
+    print(f"Applied migrations: {applied}" if applied else "Database is up to date")
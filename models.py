@@ -1,15 +1,75 @@
-from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional
-from datetime import datetime, timezone
+from compression import CompressedText
+from datetime import date, datetime, timezone
 
 class Draft(SQLModel, table=True):
+    # Schema changes to existing databases go through migrations.py
+    __table_args__ = (
+        Index("ix_draft_status_created_at", "status", "created_at"),
+        Index("ix_draft_type_created_at", "type", "created_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    prompt: str
-    content: str
-    recipient: str
-    tone: str = Field(default="friendly")
+    recipient: str = Field(index=True)
+    tone: str = Field(default="friendly", index=True)
     status: str = Field(default="draft")  # draft, sent, failed
     type: str = Field(default="general")  # general, meeting
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), index=True)
     sent_at: Optional[datetime] = Field(default=None)
     subject: Optional[str] = Field(default=None)
+
+    # Bodies live in draft_body so listing and stats queries only touch metadata rows
+    body: Optional["DraftBody"] = Relationship(
+        back_populates="draft",
+        sa_relationship_kwargs={"uselist": False, "cascade": "all, delete-orphan"}
+    )
+
+
+class DraftBody(SQLModel, table=True):
+    """Large text of a Draft, loaded only when a draft is opened or sent."""
+    __tablename__ = "draft_body"
+
+    draft_id: Optional[int] = Field(default=None, primary_key=True, foreign_key="draft.id")
+    prompt: str = Field(sa_type=CompressedText)
+    content: str = Field(sa_type=CompressedText)
+    draft: Optional[Draft] = Relationship(back_populates="body")
+
+
+def draft_subject(draft: Draft) -> str:
+    if draft.subject:
+        return draft.subject
+    content = draft.body.content if draft.body else ""
+    return content.split("\n")[0][:50] if content else "Email"
+
+
+class DraftStatsDaily(SQLModel, table=True):
+    """Per-day draft counters, kept in step with Draft writes (see stats_rollup)."""
+    day: date = Field(primary_key=True)
+    status: str = Field(primary_key=True)
+    tone: str = Field(primary_key=True)
+    type: str = Field(primary_key=True)
+    count: int = Field(default=0)
+
+
+class SendJob(SQLModel, table=True):
+    """Outbox entry for an SMTP delivery, drained by outbox workers."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    draft_id: int = Field(foreign_key="draft.id", index=True)
+    status: str = Field(default="queued", index=True)  # queued, in_progress, sent, dead
+    attempts: int = Field(default=0)
+    next_attempt_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), index=True)
+    locked_at: Optional[datetime] = Field(default=None)
+    last_error: Optional[str] = Field(default=None)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class SchemaMigration(SQLModel, table=True):
+    """Versions applied by migrations.upgrade."""
+    __tablename__ = "schema_migrations"
+
+    version: int = Field(primary_key=True)
+    description: str
+    applied_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,214 @@
+"""
+Durable outbound send queue.
+
+Sends are recorded as SendJob rows and delivered by a pool of worker threads,
+so SMTP latency never sits on the request path. Failed deliveries are retried
+with exponential backoff until ``outbox_max_attempts``, after which the job is
+dead-lettered. Workers renew the lease on jobs they are delivering, so only
+jobs left in flight by a crashed worker are reclaimed once it expires.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import delete, exists, update
+from sqlmodel import Session, select
+from config import get_settings
+from mailer import send_email
+from models import Draft, SendJob, draft_subject
+import stats_rollup
+import tracing
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+ACTIVE_STATUSES = ("queued", "in_progress")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue(session: Session, draft_id: int) -> SendJob:
+    """Queue a draft for delivery, reusing any job already pending for it.
+
+    The job is flushed so its id is available; the caller commits.
+    """
+    job = session.exec(
+        select(SendJob).where(SendJob.draft_id == draft_id, SendJob.status.in_(ACTIVE_STATUSES))
+    ).first()
+    if job is None:
+        job = SendJob(draft_id=draft_id)
+        session.add(job)
+        session.flush()
+    return job
+
+
+def has_active_job():
+    """SQL condition: the Draft row has a queued or in-flight SendJob."""
+    return exists().where(SendJob.draft_id == Draft.id, SendJob.status.in_(ACTIVE_STATUSES)).correlate(Draft)
+
+
+def remove_jobs(session: Session, draft_id: int) -> bool:
+    """Delete a draft's send jobs ahead of deleting the draft; the caller commits.
+
+    Returns False, deleting nothing, while a worker is delivering the draft.
+    """
+    in_progress = session.exec(
+        select(SendJob.id).where(SendJob.draft_id == draft_id, SendJob.status == "in_progress")
+    ).first()
+    if in_progress is not None:
+        return False
+    session.execute(delete(SendJob).where(SendJob.draft_id == draft_id))
+    return True
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    seconds = settings.outbox_backoff_base * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, settings.outbox_backoff_max))
+
+
+class OutboxWorkerPool:
+    def __init__(self, engine, workers: int = settings.outbox_workers):
+        self.engine = engine
+        self.workers = workers
+        self._stop = threading.Event()
+        self._threads = []
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+
+    def start(self):
+        self.recover_stale()
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"outbox-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        renewer = threading.Thread(target=self._renew_leases, name="outbox-lease-renewer", daemon=True)
+        renewer.start()
+        self._threads.append(renewer)
+        logger.info(f"Started {self.workers} outbox workers")
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def recover_stale(self) -> int:
+        """Requeue in-flight jobs whose worker stopped renewing them."""
+        cutoff = _now() - timedelta(seconds=settings.outbox_lease_timeout)
+        with Session(self.engine) as session:
+            result = session.execute(
+                update(SendJob)
+                .where(SendJob.status == "in_progress", SendJob.locked_at < cutoff)
+                .values(status="queued", locked_at=None, updated_at=_now())
+            )
+            session.commit()
+        if result.rowcount:
+            logger.warning(f"Requeued {result.rowcount} stale outbox jobs")
+        return result.rowcount
+
+    def _renew_leases(self):
+        """Push locked_at forward on in-flight jobs well before their lease expires."""
+        interval = max(settings.outbox_lease_timeout / 3, 1)
+        while not self._stop.wait(interval):
+            with self._in_flight_lock:
+                job_ids = list(self._in_flight)
+            if not job_ids:
+                continue
+            try:
+                with Session(self.engine) as session:
+                    session.execute(
+                        update(SendJob)
+                        .where(SendJob.id.in_(job_ids), SendJob.status == "in_progress")
+                        .values(locked_at=_now())
+                    )
+                    session.commit()
+            except Exception as e:
+                logger.error(f"Outbox lease renewal failed: {e}")
+
+    def _claim(self) -> Optional[int]:
+        with Session(self.engine) as session:
+            job_id = session.exec(
+                select(SendJob.id)
+                .where(SendJob.status == "queued", SendJob.next_attempt_at <= _now())
+                .order_by(SendJob.next_attempt_at)
+                .limit(1)
+            ).first()
+            if job_id is None:
+                return None
+            # Compare-and-set so concurrent workers never claim the same job, and a
+            # job that failed and was rescheduled meanwhile waits out its backoff
+            result = session.execute(
+                update(SendJob)
+                .where(SendJob.id == job_id, SendJob.status == "queued", SendJob.next_attempt_at <= _now())
+                .values(status="in_progress", locked_at=_now(), updated_at=_now())
+            )
+            session.commit()
+            return job_id if result.rowcount == 1 else None
+
+    def _run(self):
+        last_recovery = _now()
+        while not self._stop.is_set():
+            try:
+                if _now() - last_recovery > timedelta(seconds=settings.outbox_lease_timeout):
+                    self.recover_stale()
+                    last_recovery = _now()
+                job_id = self._claim()
+                if job_id is None:
+                    self._stop.wait(settings.outbox_poll_interval)
+                    continue
+                with self._in_flight_lock:
+                    self._in_flight.add(job_id)
+                try:
+                    with tracing.span("outbox.process", job_id=job_id):
+                        self.process(job_id)
+                finally:
+                    with self._in_flight_lock:
+                        self._in_flight.discard(job_id)
+            except Exception as e:
+                logger.error(f"Outbox worker error: {e}", exc_info=True)
+                self._stop.wait(settings.outbox_poll_interval)
+
+    def process(self, job_id: int):
+        with Session(self.engine) as session:
+            job = session.get(SendJob, job_id)
+            if job is None:
+                return
+            draft = session.get(Draft, job.draft_id)
+            if draft is None:
+                job.status = "dead"
+                job.last_error = "Draft not found"
+                job.updated_at = _now()
+                session.commit()
+                return
+
+            success = send_email(
+                to_email=draft.recipient,
+                subject=draft_subject(draft),
+                content=draft.body.content if draft.body else ""
+            )
+
+            job.attempts += 1
+            job.locked_at = None
+            job.updated_at = _now()
+            old_status = draft.status
+            if success:
+                job.status = "sent"
+                job.last_error = None
+                draft.status = "sent"
+                draft.sent_at = _now()
+            elif job.attempts >= settings.outbox_max_attempts:
+                job.status = "dead"
+                job.last_error = "SMTP delivery failed"
+                draft.status = "failed"
+                logger.error(f"Outbox job {job.id} dead-lettered after {job.attempts} attempts")
+            else:
+                job.status = "queued"
+                job.last_error = "SMTP delivery failed"
+                job.next_attempt_at = _now() + backoff_delay(job.attempts)
+            stats_rollup.record_status_change(session, draft, old_status)
+            session.commit()
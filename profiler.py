@@ -0,0 +1,80 @@
+"""
+On-demand sampling profiler for the running process.
+
+Nothing runs until a profile is requested: a sampler thread then walks
+``sys._current_frames()`` at a fixed interval for a bounded duration, which
+covers the asyncio event loop thread as well as the threadpool and outbox
+worker threads. Samples are aggregated into the collapsed-stack format
+(``thread;outer;inner count``) understood by flamegraph.pl and speedscope.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+_lock = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame, thread_name: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+# Innermost frames of threads parked waiting for work; skipped unless include_idle
+_IDLE_FUNCTIONS = {"wait", "select", "poll", "epoll", "_worker", "accept", "get"}
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return code.co_name in _IDLE_FUNCTIONS and (
+        "threading" in code.co_filename
+        or "selectors" in code.co_filename
+        or "queue" in code.co_filename
+        or "concurrent" in code.co_filename
+    )
+
+
+def sample(duration: float, interval: float, include_idle: bool = False) -> Counter:
+    """Sample every thread's stack each ``interval`` seconds for ``duration`` seconds.
+
+    Raises ProfilerBusy if another profile is already running.
+    """
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        stacks = Counter()
+        me = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if not include_idle and _is_idle(frame):
+                    continue
+                stacks[_collapse(frame, names.get(ident, f"thread-{ident}"))] += 1
+            time.sleep(interval)
+        return stacks
+    finally:
+        _lock.release()
+
+
+def collapsed(stacks: Counter, limit: Optional[int] = None) -> str:
+    lines = [f"{stack} {count}" for stack, count in stacks.most_common(limit)]
+    return "\n".join(lines) + "\n" if lines else ""
@@ -1,23 +1,20 @@
 # backend/reset_db.py
-import os
-from sqlmodel import SQLModel, create_engine
-from models import Draft
+from sqlmodel import SQLModel
+from database import engine
+import migrations
+import search_index
 
 def reset_database():
     """Reset the database with the new schema"""
-    # Get the backend directory path
-    backend_dir = os.path.dirname(os.path.abspath(__file__))
-    database_path = os.path.join(backend_dir, "database.db")
-    
-    # Remove existing database file
-    if os.path.exists(database_path):
-        os.remove(database_path)
-        print(f"Removed existing database at {database_path}")
-    
-    # Create new database with updated schema
-    engine = create_engine(f"sqlite:///{database_path}")
-    SQLModel.metadata.create_all(engine)
-    print(f"Created new database with updated schema at {database_path}")
+    # Drop and recreate every table on the configured database
+    SQLModel.metadata.drop_all(engine)
+    print(f"Dropped existing tables on {engine.url.render_as_string(hide_password=True)}")
+
+    with engine.begin() as connection:
+        # draft_search is raw SQL, outside the SQLModel metadata
+        search_index.drop_index(connection)
+        migrations.upgrade(connection)
+    print(f"Created new database with updated schema on {engine.url.render_as_string(hide_password=True)}")
 
 if __name__ == "__main__":
-    reset_database() 
\ No newline at end of file
+    reset_database()
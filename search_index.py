@@ -0,0 +1,185 @@
+"""
+Full-text index over draft subject, prompt and content.
+
+SQLite uses a contentless FTS5 table keyed by draft id, so the index holds
+only terms rather than a second, uncompressed copy of every body; snippets
+are built from the decompressed DraftBody rows of the page of hits. A
+contentless row can only be removed with the values it was indexed with, so
+callers must remove a draft's entry *before* changing its text. MySQL FULLTEXT
+needs the text in its own indexed columns, so there the index table does keep
+an uncompressed copy. The helpers below run in the caller's transaction,
+next to the Draft change itself.
+"""
+
+import html
+import re
+from sqlalchemy import select, text
+from models import Draft, DraftBody
+
+SUPPORTED_DIALECTS = ("sqlite", "mysql")
+
+SEARCH_COLUMNS = "d.id, d.recipient, d.subject, d.status, d.tone, d.type, d.created_at"
+SNIPPET_CHARS = 160
+
+
+def _dialect(conn) -> str:
+    """Dialect name for a Connection or a Session."""
+    if hasattr(conn, "dialect"):
+        return conn.dialect.name
+    return conn.get_bind().dialect.name
+
+
+def create_index(conn):
+    dialect = _dialect(conn)
+    if dialect == "sqlite":
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS draft_search "
+            "USING fts5(subject, prompt, content, content='', tokenize='porter unicode61')"
+        ))
+    elif dialect == "mysql":
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS draft_search ("
+            "draft_id INT PRIMARY KEY, subject TEXT, prompt MEDIUMTEXT, content MEDIUMTEXT, "
+            "FULLTEXT KEY ft_draft_search (subject, prompt, content)) ENGINE=InnoDB"
+        ))
+
+
+def drop_index(conn):
+    if _dialect(conn) in SUPPORTED_DIALECTS:
+        conn.execute(text("DROP TABLE IF EXISTS draft_search"))
+
+
+def _insert(conn, rows):
+    if not rows:
+        return
+    if _dialect(conn) == "sqlite":
+        statement = "INSERT INTO draft_search (rowid, subject, prompt, content) VALUES (:id, :subject, :prompt, :content)"
+    else:
+        statement = "INSERT INTO draft_search (draft_id, subject, prompt, content) VALUES (:id, :subject, :prompt, :content)"
+    conn.execute(text(statement), rows)
+
+
+def remove_draft(conn, draft: Draft):
+    """Drop a draft's entry; its subject and body must still hold the indexed text."""
+    dialect = _dialect(conn)
+    if dialect == "sqlite":
+        if draft.body is None:
+            return  # never indexed
+        conn.execute(
+            text("INSERT INTO draft_search (draft_search, rowid, subject, prompt, content) "
+                 "VALUES ('delete', :id, :subject, :prompt, :content)"),
+            {"id": draft.id, "subject": draft.subject, "prompt": draft.body.prompt, "content": draft.body.content},
+        )
+    elif dialect == "mysql":
+        conn.execute(text("DELETE FROM draft_search WHERE draft_id = :id"), {"id": draft.id})
+
+
+def index_drafts(conn, drafts):
+    """Index newly flushed drafts; their bodies must already be loaded."""
+    if _dialect(conn) not in SUPPORTED_DIALECTS:
+        return
+    _insert(conn, [
+        {"id": d.id, "subject": d.subject, "prompt": d.body.prompt, "content": d.body.content}
+        for d in drafts
+    ])
+
+
+def rebuild(conn, batch_size: int = 1000):
+    """Recreate index rows for every draft, decompressing bodies in batches."""
+    if _dialect(conn) not in SUPPORTED_DIALECTS:
+        return
+    if _dialect(conn) == "sqlite":
+        conn.execute(text("INSERT INTO draft_search (draft_search) VALUES ('delete-all')"))
+    else:
+        conn.execute(text("DELETE FROM draft_search"))
+    query = (
+        select(Draft.id, Draft.subject, DraftBody.prompt, DraftBody.content)
+        .join(DraftBody, DraftBody.draft_id == Draft.id)
+        .order_by(Draft.id)
+    )
+    last_id = 0
+    while True:
+        batch = conn.execute(query.where(Draft.id > last_id).limit(batch_size)).all()
+        if not batch:
+            break
+        _insert(conn, [
+            {"id": row[0], "subject": row[1], "prompt": row[2], "content": row[3]} for row in batch
+        ])
+        last_id = batch[-1][0]
+
+
+def _fts5_query(q: str) -> str:
+    # Quote every term so user input can't break FTS5 query syntax
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def _term_pattern(q: str):
+    # Loose stand-in for the porter stemmer: match words starting with each term's stem
+    stems = []
+    for term in q.split():
+        stem = term.lower()
+        for suffix in ("ing", "ed", "es", "s"):
+            if stem.endswith(suffix) and len(stem) > len(suffix) + 2:
+                stem = stem[:-len(suffix)]
+                break
+        stems.append(re.escape(stem))
+    return re.compile(r"\b(?:" + "|".join(stems) + r")\w*", re.IGNORECASE)
+
+
+def snippet(value: str, pattern) -> str:
+    """HTML-escaped window of ``value`` around the first match, matches wrapped in <b>."""
+    match = pattern.search(value)
+    start = max(0, match.start() - SNIPPET_CHARS // 3) if match else 0
+    window = value[start:start + SNIPPET_CHARS]
+    parts, last = [], 0
+    for m in pattern.finditer(window):
+        parts.append(html.escape(window[last:m.start()]))
+        parts.append(f"<b>{html.escape(m.group())}</b>")
+        last = m.end()
+    parts.append(html.escape(window[last:]))
+    prefix = "..." if start else ""
+    suffix = "..." if start + SNIPPET_CHARS < len(value) else ""
+    return prefix + "".join(parts) + suffix
+
+
+def _add_snippets(conn, hits, q: str):
+    if not hits:
+        return hits
+    bodies = {
+        row[0]: row[1:] for row in conn.execute(
+            select(DraftBody.draft_id, DraftBody.prompt, DraftBody.content)
+            .where(DraftBody.draft_id.in_([hit["id"] for hit in hits]))
+        )
+    }
+    pattern = _term_pattern(q)
+    for hit in hits:
+        prompt, content = bodies.get(hit["id"], ("", ""))
+        fields = [content or "", hit["subject"] or "", prompt or ""]
+        best = next((value for value in fields if pattern.search(value)), fields[0])
+        hit["snippet"] = snippet(best, pattern)
+    return hits
+
+
+def search(conn, q: str, limit: int, offset: int):
+    """Ranked matches with an escaped, highlighted snippet; best match first."""
+    dialect = _dialect(conn)
+    if dialect == "sqlite":
+        statement = text(
+            f"SELECT {SEARCH_COLUMNS}, bm25(draft_search) AS score "
+            "FROM draft_search JOIN draft d ON d.id = draft_search.rowid "
+            "WHERE draft_search MATCH :q ORDER BY score LIMIT :limit OFFSET :offset"
+        )
+        params = {"q": _fts5_query(q), "limit": limit, "offset": offset}
+    elif dialect == "mysql":
+        statement = text(
+            f"SELECT {SEARCH_COLUMNS}, "
+            "MATCH(s.subject, s.prompt, s.content) AGAINST (:q IN NATURAL LANGUAGE MODE) AS score "
+            "FROM draft_search s JOIN draft d ON d.id = s.draft_id "
+            "WHERE MATCH(s.subject, s.prompt, s.content) AGAINST (:q IN NATURAL LANGUAGE MODE) "
+            "ORDER BY score DESC LIMIT :limit OFFSET :offset"
+        )
+        params = {"q": q, "limit": limit, "offset": offset}
+    else:
+        raise NotImplementedError(f"Full-text search is not supported on {dialect}")
+    hits = [dict(row._mapping) for row in conn.execute(statement, params)]
+    return _add_snippets(conn, hits, q)
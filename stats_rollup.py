@@ -0,0 +1,86 @@
+"""
+Maintenance of the DraftStatsDaily rollup that backs /stats.
+
+Each helper runs inside the caller's session so counters commit atomically
+with the Draft change they describe.
+"""
+
+from collections import Counter
+from sqlalchemy import delete, func, insert
+from sqlalchemy.dialects import mysql, sqlite
+from sqlmodel import Session, select
+from models import Draft, DraftStatsDaily
+
+
+def _bump_key(session: Session, day, status: str, tone: str, type: str, delta: int):
+    # Single-statement upsert: concurrent writers creating the same key can't both insert it
+    values = dict(day=day, status=status, tone=tone, type=type, count=delta)
+    if session.get_bind().dialect.name == "mysql":
+        statement = mysql.insert(DraftStatsDaily).values(**values)
+        statement = statement.on_duplicate_key_update(count=DraftStatsDaily.count + statement.inserted.count)
+    else:
+        statement = sqlite.insert(DraftStatsDaily).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=["day", "status", "tone", "type"],
+            set_={"count": DraftStatsDaily.count + statement.excluded.count},
+        )
+    session.execute(statement)
+
+
+def _bump(session: Session, draft: Draft, status: str, delta: int):
+    _bump_key(session, draft.created_at.date(), status, draft.tone, draft.type, delta)
+
+
+def record_insert(session: Session, draft: Draft):
+    _bump(session, draft, draft.status, 1)
+
+
+def record_inserts(session: Session, drafts):
+    """Record many new drafts with one counter update per distinct rollup key."""
+    counts = Counter((d.created_at.date(), d.status, d.tone, d.type) for d in drafts)
+    for (day, status, tone, type), delta in counts.items():
+        _bump_key(session, day, status, tone, type, delta)
+
+
+def record_delete(session: Session, draft: Draft):
+    _bump(session, draft, draft.status, -1)
+
+
+def record_status_change(session: Session, draft: Draft, old_status: str):
+    if old_status != draft.status:
+        _bump(session, draft, old_status, -1)
+        _bump(session, draft, draft.status, 1)
+
+
+def rebuild(session: Session):
+    """Recompute every rollup row from the Draft table."""
+    session.execute(delete(DraftStatsDaily))
+    session.execute(
+        insert(DraftStatsDaily).from_select(
+            ["day", "status", "tone", "type", "count"],
+            select(
+                func.date(Draft.created_at), Draft.status, Draft.tone, Draft.type, func.count(Draft.id)
+            ).group_by(func.date(Draft.created_at), Draft.status, Draft.tone, Draft.type),
+        )
+    )
+
+
+def rebuild_if_empty(session: Session) -> bool:
+    """Backfill the rollup for databases that predate it."""
+    if session.exec(select(DraftStatsDaily.day).limit(1)).first() is not None:
+        return False
+    if session.exec(select(Draft.id).limit(1)).first() is None:
+        return False
+    rebuild(session)
+    return True
+
+
+if __name__ == "__main__":
+    from database import engine
+    import migrations
+
+    migrations.upgrade_database(engine)
+    with Session(engine) as session:
+        rebuild(session)
+        session.commit()
+    print("Rebuilt draft stats rollup")
@@ -0,0 +1,36 @@
+"""
+Sandboxed Jinja2 rendering for campaign templates.
+
+Templates come from the LLM, so they are rendered in a SandboxedEnvironment
+and compiled once per distinct source. Undefined placeholders raise
+UndefinedError instead of rendering as empty strings.
+"""
+
+from functools import lru_cache
+from typing import Dict, Set
+from jinja2 import StrictUndefined, Template, TemplateSyntaxError, meta
+from jinja2.sandbox import SandboxedEnvironment
+
+env = SandboxedEnvironment(autoescape=False, keep_trailing_newline=True, undefined=StrictUndefined)
+
+
+@lru_cache(maxsize=256)
+def compile_template(source: str) -> Template:
+    return env.from_string(source)
+
+
+def is_valid(source: str) -> bool:
+    try:
+        compile_template(source)
+        return True
+    except TemplateSyntaxError:
+        return False
+
+
+def placeholders(source: str) -> Set[str]:
+    """Variable names the template reads; ``source`` must be valid."""
+    return meta.find_undeclared_variables(env.parse(source))
+
+
+def render(source: str, variables: Dict[str, str]) -> str:
+    return compile_template(source).render(**variables)
@@ -0,0 +1,45 @@
+"""
+Regression tests for the outbox worker pool.
+
+Run with: python -m pytest test_outbox.py
+"""
+
+import time
+from sqlmodel import Session, SQLModel, create_engine, select
+from models import Draft, DraftBody, SendJob
+import outbox
+
+
+def _engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}", connect_args={"timeout": 30})
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def test_failed_jobs_wait_for_backoff_with_concurrent_workers(tmp_path, monkeypatch):
+    engine = _engine(tmp_path)
+    monkeypatch.setattr(outbox, "send_email", lambda **kwargs: False)
+    monkeypatch.setattr(outbox.settings, "outbox_poll_interval", 0.01)
+    monkeypatch.setattr(outbox.settings, "outbox_backoff_base", 30)
+
+    with Session(engine) as session:
+        for i in range(50):
+            draft = Draft(recipient=f"user{i}@example.com", body=DraftBody(prompt="p", content="c"))
+            session.add(draft)
+            session.flush()
+            outbox.enqueue(session, draft.id)
+        session.commit()
+
+    pool = outbox.OutboxWorkerPool(engine, workers=8)
+    pool.start()
+    try:
+        time.sleep(3)
+    finally:
+        pool.stop()
+
+    with Session(engine) as session:
+        jobs = session.exec(select(SendJob)).all()
+    assert len(jobs) == 50
+    # Every job failed once and is waiting out its 30s backoff; none was retried early
+    assert [job.attempts for job in jobs] == [1] * 50
+    assert {job.status for job in jobs} == {"queued"}
@@ -0,0 +1,159 @@
+"""
+Lightweight request tracing.
+
+Spans nest through a ContextVar, so a span opened in a route is the parent of
+spans opened by anything it awaits or hands to the threadpool. Finished spans
+go to an in-memory ring buffer (served by GET /traces) and, when
+``trace_file`` is set, to a JSON-lines file written by a background thread
+so request handlers never touch the disk. Trace context is propagated to
+outbound HTTP calls as a W3C ``traceparent`` header.
+"""
+
+import atexit
+import json
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from config import get_settings
+
+settings = get_settings()
+
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_buffer = deque(maxlen=settings.trace_buffer_size)
+_pending = deque(maxlen=max(settings.trace_buffer_size * 4, 10000))  # spans not yet written to trace_file
+_writer: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+WRITE_INTERVAL = 0.5  # seconds between trace_file flushes
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end", "attributes", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.end = None
+        self.attributes = attributes
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.status = "error"
+        self.attributes["error"] = repr(error)
+
+    def finish(self):
+        self.end = time.time()
+        _export(self)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": round((self.end - self.start) * 1000, 3) if self.end else None,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+def _drain(f):
+    while _pending:
+        f.write(json.dumps(_pending.popleft().to_dict(), default=str) + "\n")
+    f.flush()
+
+
+def _write_spans():
+    """Writer thread: append pending spans to trace_file through one open handle."""
+    with open(settings.trace_file, "a") as f:
+        atexit.register(_drain, f)
+        while True:
+            time.sleep(WRITE_INTERVAL)
+            _drain(f)
+
+
+def _start_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_spans, name="trace-writer", daemon=True)
+            _writer.start()
+
+
+def _export(span: Span):
+    _buffer.append(span)
+    if settings.trace_file:
+        _pending.append(span)
+        if _writer is None:
+            _start_writer()
+
+
+def start_span(name: str, parent: Optional[Tuple[str, str]] = None, **attributes) -> Optional[Span]:
+    """Start a span under ``parent`` (trace_id, span_id) or the current span without activating it."""
+    if not settings.tracing_enabled:
+        return None
+    if parent is None:
+        current = _current.get()
+        parent = (current.trace_id, current.span_id) if current else None
+    trace_id, parent_id = parent if parent else (_new_id(128), None)
+    return Span(name, trace_id, parent_id, attributes)
+
+
+@contextmanager
+def span(name: str, parent: Optional[Tuple[str, str]] = None, **attributes):
+    """Run the block inside a new span that becomes the parent of nested spans."""
+    current = start_span(name, parent, **attributes)
+    if current is None:
+        yield None
+        return
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.finish()
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def inject(headers: Dict[str, str]) -> Dict[str, str]:
+    """Add a ``traceparent`` header for the current span, if any."""
+    current = _current.get()
+    if current is not None:
+        headers["traceparent"] = f"00-{current.trace_id}-{current.span_id}-01"
+    return headers
+
+
+def extract(headers) -> Optional[Tuple[str, str]]:
+    """Parse an incoming ``traceparent`` header into (trace_id, span_id)."""
+    value = headers.get("traceparent")
+    if not value:
+        return None
+    parts = value.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+def recent_spans(trace_id: Optional[str] = None, limit: int = 200):
+    spans = [s for s in reversed(_buffer) if trace_id is None or s.trace_id == trace_id]
+    return [s.to_dict() for s in spans[:limit]]